@@ -0,0 +1,85 @@
+import argparse
+import platform
+import sys
+
+import mxnet as mx
+
+from benchmarks import dispatch
+from benchmarks import fusion
+from benchmarks import harness
+from benchmarks import lowering
+from benchmarks import models
+from benchmarks import ops
+from benchmarks import optimizers
+from benchmarks import startup
+
+suites = {
+    'ops': lambda steps: ops.run(ops.default_sizes, ops.default_image_sizes, steps),
+    'dispatch': lambda steps: dispatch.run(100, steps),
+    'fusion': lambda steps: {
+        'fusion/%s/%s' % (variant, metric): result[metric]
+        for variant, result in fusion.run(16, 256, 256, steps).items()
+        for metric in ['train', 'train_peak_bytes', 'infer', 'infer_peak_bytes']
+    },
+    'lowering': lambda steps: lowering.run(lowering.default_sizes),
+    'models': lambda steps: models.run(64, steps),
+    'optimizers': lambda steps: {
+        'optimizers/%s' % name: seconds
+        for name, seconds in optimizers.run(50, 4096, steps).items()
+    },
+    'startup': lambda steps: startup.run(5),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmarks')
+    parser.add_argument('--suite', '-s', action='append', choices=sorted(suites), help='Defaults to all of them')
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--output', '-o', type=str, help='A path to write the results to as JSON')
+    parser.add_argument('--baseline', '-b', type=str, help='A path to results to compare against')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=1.1,
+        help='The slowdown relative to the baseline that counts as a regression',
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for suite in args.suite or sorted(suites):
+        results.update(suites[suite](args.steps))
+
+    output = {
+        'metadata': {
+            'python': platform.python_version(),
+            'mxnet': mx.__version__,
+            'machine': platform.machine(),
+            'steps': args.steps,
+        },
+        'results': results,
+    }
+    if args.output:
+        harness.save(output, args.output)
+
+    if args.baseline is None:
+        for name, value in sorted(results.items()):
+            print('%-72s %s' % (name, harness.format_result(name, value)))
+    else:
+        baseline = harness.load(args.baseline)['results']
+        regressions = 0
+        for name, value, before, ratio, regressed in harness.compare(results, baseline, args.threshold):
+            print(
+                '%-72s %s %s %8.2fx%s' % (
+                    name,
+                    harness.format_result(name, before),
+                    harness.format_result(name, value),
+                    ratio,
+                    ' REGRESSED' if regressed else '',
+                )
+            )
+            regressions += regressed
+        missing = sorted(set(baseline) - set(results))
+        if missing:
+            print('%d baseline benchmarks were not run' % len(missing))
+        if regressions:
+            print('%d benchmarks regressed by more than %.0f%%' % (regressions, (args.threshold - 1) * 100))
+            sys.exit(1)
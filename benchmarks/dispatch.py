@@ -0,0 +1,83 @@
+import argparse
+
+import mxnet as mx
+
+from benchmarks.harness import time_steps
+from cognite import meta
+from cognite.add import add_fn
+from cognite.meta import add, relu
+from cognite.relu import relu_fn
+
+# Both graphs apply trivial ops to single values, so what's left is the
+# cost of getting values to and from the ops.
+
+def chain(n):
+    def f(x):
+        x.assert_shape((1,))
+        for i in range(n):
+            x = relu(x)
+        return x
+    def direct(args):
+        (x,) = args
+        backs = []
+        for i in range(n):
+            x, back = relu_fn.forward([x])
+            backs.append(back)
+        return x, backs
+    return f, direct, n
+
+def fan_in(n):
+    def f(xs):
+        for i in range(n):
+            xs[str(i)].assert_shape((1,))
+        total = xs['0']
+        for i in range(1, n):
+            total = add(total, xs[str(i)])
+        return total
+    def direct(args):
+        (xs,) = args
+        total = xs['0']
+        backs = []
+        for i in range(1, n):
+            total, back = add_fn.forward([total, xs[str(i)]])
+            backs.append(back)
+        return total, backs
+    return f, direct, n - 1
+
+def make_args(n, name):
+    if name == 'fan_in':
+        return [{str(i): mx.ndarray.ones((1,)) for i in range(n)}]
+    return [mx.ndarray.ones((1,))]
+
+def run(n, steps, backends=('combinators', 'tape')):
+    results = {}
+    gradient = mx.ndarray.ones((1,))
+    for name, graph in [('chain', chain), ('fan_in', fan_in)]:
+        f, direct, ops = graph(n)
+        args = make_args(n, name)
+
+        def direct_step():
+            output, backs = direct(args)
+            g = gradient
+            for back in reversed(backs):
+                g = back(g)[0]
+        results['dispatch/%s/direct' % name] = time_steps(direct_step, steps) / ops
+
+        for backend in backends:
+            function = meta.differentiable_function(f, backend=backend)
+            def step():
+                (output,), backward = function(*args)
+                backward(gradient)
+            results['dispatch/%s/%s/train' % (name, backend)] = time_steps(step, steps) / ops
+            results['dispatch/%s/%s/infer' % (name, backend)] = \
+                time_steps(lambda: function.infer(*args), steps) / ops
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Dispatch overhead per op')
+    parser.add_argument('--ops', type=int, default=100)
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    for name, seconds in run(args.ops, args.steps).items():
+        print('%-40s %10.3f us/op' % (name, seconds * 1e6))
@@ -0,0 +1,122 @@
+import argparse
+import os
+import subprocess
+import sys
+
+import mxnet as mx
+
+from benchmarks.harness import time_steps
+from cognite import expr
+from cognite import meta
+from cognite.meta import add, add_biases, linear, mean, relu, squared_difference
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+variants = {
+    'unfused': {},
+    'fused': {'fuse': True},
+}
+
+def make_model(depth, width):
+    def model(params, x):
+        x.assert_shape((expr.batch, width))
+        h = x
+        for i in range(depth):
+            weights = params['w%d' % i]
+            weights.assert_shape((width, width))
+            weights.set_initializer(lambda: mx.ndarray.random_normal(scale=width**-0.5, shape=(width, width)))
+            h = add(h, relu(add_biases(linear(h, weights), params['b%d' % i])))
+        return mean(squared_difference(h, x), (0, 1))
+    return model
+
+def setup(variant, depth, width, batch_size):
+    mx.random.seed(0)
+    function = meta.differentiable_function(make_model(depth, width), **variants[variant])
+    parameters = function.parameters[0].instantiate()
+    x = mx.ndarray.random_normal(shape=(batch_size, width))
+
+    def train():
+        (loss,), backward = function(parameters, x)
+        backward(mx.ndarray.ones(loss.shape))
+    def infer():
+        function.infer(parameters, x)
+    return function, {'train': train, 'infer': infer}
+
+def resident_bytes(field):
+    with open('/proc/self/status') as fd:
+        for line in fd:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+
+def peak_bytes(variant, mode, depth, width, batch_size, steps):
+    # Memory MXNet frees goes back to its pool rather than the system, so
+    # how far the process's peak resident size rises above where it was
+    # before the steps is how much they needed at once. Each measurement
+    # gets a fresh process to start from an empty pool. This relies on
+    # Linux's /proc to reset and read the peak.
+    output = subprocess.run(
+        [
+            sys.executable, '-m', 'benchmarks.fusion',
+            '--measure-peak', variant, mode,
+            '--depth', str(depth),
+            '--width', str(width),
+            '--batch-size', str(batch_size),
+            '--steps', str(steps),
+        ],
+        cwd=root,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.split()
+    return int(output[-1])
+
+def measure_peak(variant, mode, depth, width, batch_size, steps):
+    function, modes = setup(variant, depth, width, batch_size)
+    mx.ndarray.waitall()
+    with open('/proc/self/clear_refs', 'w') as fd:
+        fd.write('5')
+    before = resident_bytes('VmRSS')
+    for i in range(steps):
+        modes[mode]()
+    mx.ndarray.waitall()
+    return resident_bytes('VmHWM') - before
+
+def run(depth, width, batch_size, steps):
+    results = {}
+    for variant in variants:
+        function, modes = setup(variant, depth, width, batch_size)
+        result = {
+            'operations': sum(1 for e in expr.topological_sort(function.body) if isinstance(e, expr.Apply)),
+        }
+        for mode, step in modes.items():
+            result[mode] = time_steps(step, steps)
+            result[mode + '_peak_bytes'] = peak_bytes(variant, mode, depth, width, batch_size, min(steps, 3))
+        results[variant] = result
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Elementwise fusion benchmark')
+    parser.add_argument('--depth', type=int, default=32)
+    parser.add_argument('--width', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--measure-peak', nargs=2, metavar=('VARIANT', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_peak:
+        variant, mode = args.measure_peak
+        print(measure_peak(variant, mode, args.depth, args.width, args.batch_size, args.steps))
+        sys.exit(0)
+
+    results = run(args.depth, args.width, args.batch_size, args.steps)
+    for name, result in results.items():
+        print(
+            '%-8s %4d ops %8.3f ms/train step %8.2f MB train peak %8.3f ms/inference %8.2f MB inference peak' % (
+                name,
+                result['operations'],
+                result['train'] * 1000,
+                result['train_peak_bytes'] / 2**20,
+                result['infer'] * 1000,
+                result['infer_peak_bytes'] / 2**20,
+            )
+        )
@@ -0,0 +1,39 @@
+import json
+import time
+
+import mxnet as mx
+
+def time_steps(step, steps):
+    step()
+    mx.ndarray.waitall()
+    start = time.perf_counter()
+    for i in range(steps):
+        step()
+    mx.ndarray.waitall()
+    return (time.perf_counter() - start) / steps
+
+def shape_name(*shapes):
+    return ','.join('x'.join(map(str, shape)) for shape in shapes)
+
+# Results are seconds unless their name says otherwise, so that memory
+# figures can sit beside timings and be compared the same way.
+def format_result(name, value):
+    if name.endswith('_bytes'):
+        return '%12.3f MB' % (value / 2**20)
+    return '%12.3f ms' % (value * 1000)
+
+def save(results, path):
+    with open(path, 'w') as fd:
+        json.dump(results, fd, indent=2, sort_keys=True)
+
+def load(path):
+    with open(path) as fd:
+        return json.load(fd)
+
+def compare(results, baseline, threshold=1.1):
+    # Yields (name, value, baseline value, ratio, regressed) for every
+    # benchmark present in both.
+    for name in sorted(results):
+        if name in baseline:
+            ratio = results[name] / baseline[name] if baseline[name] else float('inf')
+            yield name, results[name], baseline[name], ratio, ratio > threshold
@@ -0,0 +1,71 @@
+import argparse
+import os
+import tempfile
+import time
+
+from cognite import expr
+from cognite import meta
+from cognite.meta import add, add_biases, linear, relu
+
+# An unrolled recurrent network: every step reads the same weights and its
+# own input, so the live set stays large for the whole graph.
+def rnn(steps, width=16):
+    def model(params, inputs):
+        params['w'].assert_shape((width, width))
+        params['u'].assert_shape((width, width))
+        h = inputs['0']
+        h.assert_shape((expr.batch, width))
+        for i in range(1, steps):
+            x = inputs[str(i)]
+            x.assert_shape((expr.batch, width))
+            h = relu(add_biases(add(linear(h, params['w']), linear(x, params['u'])), params['b']))
+        return h
+    return model
+
+def time_lowering(steps):
+    model = rnn(steps)
+    start = time.perf_counter()
+    function = meta.differentiable_function(model)
+    traced = time.perf_counter()
+    function.transform()
+    lowered = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rnn.program')
+        function.save(path)
+        start_load = time.perf_counter()
+        meta.load_function(path)
+        loaded = time.perf_counter()
+    return {
+        'trace': traced - start,
+        'lower': lowered - traced,
+        'load': loaded - start_load,
+        'nodes': len(expr.topological_sort(function.body)),
+    }
+
+def run(sizes):
+    results = {}
+    for steps in sizes:
+        timings = time_lowering(steps)
+        results['lowering/rnn%d/trace' % steps] = timings['trace']
+        results['lowering/rnn%d/lower' % steps] = timings['lower']
+        results['lowering/rnn%d/load' % steps] = timings['load']
+    return results
+
+default_sizes = [100, 300, 1000, 3000]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Lowering time against graph size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes)
+    args = parser.parse_args()
+
+    for steps in args.sizes:
+        timings = time_lowering(steps)
+        print(
+            '%6d steps %7d nodes %10.3f s trace %10.3f s lower %10.3f s load' % (
+                steps,
+                timings['nodes'],
+                timings['trace'],
+                timings['lower'],
+                timings['load'],
+            )
+        )
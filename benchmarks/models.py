@@ -0,0 +1,66 @@
+import argparse
+import math
+
+import mxnet as mx
+
+from benchmarks.harness import time_steps
+from cognite import expr
+from cognite import meta
+from cognite.meta import add_biases, convolution2d, linear, mean, relu, reshape, softmax_cross_entropy
+
+def mlp(width=256, depth=3, classes=10):
+    def model(params, x, labels):
+        x.assert_shape((expr.batch, width))
+        h = x
+        for i in range(depth):
+            weights = params['w%d' % i]
+            weights.assert_shape((width, width))
+            weights.set_initializer(lambda: mx.ndarray.random_normal(scale=width**-0.5, shape=(width, width)))
+            h = relu(add_biases(linear(h, weights), params['b%d' % i]))
+        weights = params['output']
+        weights.assert_shape((width, classes))
+        weights.set_initializer(lambda: mx.ndarray.random_normal(scale=width**-0.5, shape=(width, classes)))
+        logits = add_biases(linear(h, weights), params['output_biases'])
+        return mean(softmax_cross_entropy(logits, labels), (0,))
+    return model, (width,), classes
+
+def convnet(size=28, channels=16, classes=10):
+    def model(params, x, labels):
+        x.assert_shape((expr.batch, size, size, 1))
+        h = relu(add_biases(convolution2d(x, params['c0'], (3, 3), channels, stride=2, pad=1), params['b0']))
+        h = relu(add_biases(convolution2d(h, params['c1'], (3, 3), channels, stride=2, pad=1), params['b1']))
+        features = math.ceil(size / 4) ** 2 * channels
+        h = reshape(h, (expr.batch, features))
+        weights = params['output']
+        weights.assert_shape((features, classes))
+        weights.set_initializer(lambda: mx.ndarray.random_normal(scale=features**-0.5, shape=(features, classes)))
+        logits = add_biases(linear(h, weights), params['output_biases'])
+        return mean(softmax_cross_entropy(logits, labels), (0,))
+    return model, (size, size, 1), classes
+
+def run(batch_size, steps, backends=('combinators', 'tape')):
+    results = {}
+    for name, (model, shape, classes) in [('mlp', mlp()), ('convnet', convnet())]:
+        x = mx.ndarray.random_normal(shape=(batch_size,) + shape)
+        labels = mx.ndarray.softmax(mx.ndarray.random_normal(shape=(batch_size, classes)))
+        parameters = None
+        for backend in backends:
+            function = meta.differentiable_function(model, backend=backend)
+            if parameters is None:
+                parameters = function.parameters[0].instantiate()
+            def step():
+                (loss,), backward = function(parameters, x, labels)
+                backward(mx.ndarray.ones(loss.shape))
+            results['models/%s/%s/train' % (name, backend)] = time_steps(step, steps)
+            results['models/%s/%s/infer' % (name, backend)] = \
+                time_steps(lambda: function.infer(parameters, x, labels), steps)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'End to end model benchmarks')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    for name, seconds in run(args.batch_size, args.steps).items():
+        print('%-40s %10.3f ms' % (name, seconds * 1000))
@@ -0,0 +1,68 @@
+import argparse
+
+import mxnet as mx
+
+from benchmarks.harness import shape_name, time_steps
+from cognite.broadcast import Broadcast
+from cognite.convolution import Convolution
+from cognite.linear import linear_fn
+from cognite.mean import Mean
+from cognite.sigmoid_cross_entropy import sigmoid_cross_entropy_fn
+from cognite.softmax_cross_entropy import softmax_cross_entropy_fn
+from cognite.sparse_softmax_cross_entropy import sparse_softmax_cross_entropy_fn
+from cognite.squared_difference import squared_difference_fn
+
+def normal(*shape):
+    return mx.ndarray.random_normal(shape=shape)
+
+def probabilities(*shape):
+    return mx.ndarray.softmax(normal(*shape))
+
+def binary(*shape):
+    return mx.ndarray.random_uniform(shape=shape) > 0.5
+
+def classes(batch, n):
+    return mx.ndarray.floor(mx.ndarray.random_uniform(high=n, shape=(batch,)))
+
+def cases(sizes, image_sizes):
+    for batch, n in sizes:
+        yield 'linear', linear_fn, [normal(batch, n), normal(n, n)]
+        yield 'broadcast', Broadcast((batch, n)), [normal(n)]
+        yield 'mean', Mean((0, 1)), [normal(batch, n)]
+        yield 'squared_difference', squared_difference_fn, [normal(batch, n), normal(batch, n)]
+        yield 'softmax_cross_entropy', softmax_cross_entropy_fn, [normal(batch, n), probabilities(batch, n)]
+        yield 'sigmoid_cross_entropy', sigmoid_cross_entropy_fn, [normal(batch, n), binary(batch, n)]
+        yield 'sparse_softmax_cross_entropy', sparse_softmax_cross_entropy_fn, [normal(batch, n), classes(batch, n)]
+
+    for batch, size, channels in image_sizes:
+        for layout in ['NHWC', 'NCHW']:
+            if layout == 'NHWC':
+                activations = normal(batch, size, size, channels)
+            else:
+                activations = normal(batch, channels, size, size)
+            yield \
+                'convolution_%s' % layout.lower(), \
+                Convolution((3, 3), channels, layout), \
+                [activations, normal(3, 3, channels, channels)]
+
+def run(sizes, image_sizes, steps):
+    results = {}
+    for name, function, args in cases(sizes, image_sizes):
+        prefix = 'ops/%s/%s' % (name, shape_name(*(arg.shape for arg in args)))
+        output, backward = function.forward(args)
+        gradient = mx.ndarray.ones(output.shape)
+        results[prefix + '/forward'] = time_steps(lambda: function.forward(args), steps)
+        results[prefix + '/backward'] = time_steps(lambda: backward(gradient), steps)
+        results[prefix + '/infer'] = time_steps(lambda: function.infer(args), steps)
+    return results
+
+default_sizes = [(32, 128), (128, 512), (256, 1024)]
+default_image_sizes = [(8, 16, 16), (8, 32, 32)]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Op benchmarks')
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    for name, seconds in run(default_sizes, default_image_sizes, args.steps).items():
+        print('%-72s %10.3f ms' % (name, seconds * 1000))
@@ -0,0 +1,80 @@
+import argparse
+import math
+
+import mxnet as mx
+
+from benchmarks.harness import time_steps
+from cognite import data
+from cognite import flat
+from cognite import optimizers
+
+def make_tree(leaves, size):
+    output = {}
+    for i in range(leaves):
+        output['p%d' % i] = mx.ndarray.random_normal(shape=(size,))
+    return output
+
+class NaiveAdam:
+    def __init__(self, learning_rate=0.001, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.mean = None
+        self.variance = None
+        self.steps = 0
+
+    def update(self, parameters, gradients):
+        if self.mean is None:
+            self.mean = data.zeros({key: value.shape for key, value in parameters.items()})
+            self.variance = data.zeros({key: value.shape for key, value in parameters.items()})
+        self.steps += 1
+        t = self.steps
+        learning_rate = self.learning_rate * math.sqrt(1 - self.beta2**t) / (1 - self.beta1**t)
+        self.mean = \
+            data.add(
+                data.multiply_scalar(self.beta1, self.mean),
+                data.multiply_scalar(1 - self.beta1, gradients),
+            )
+        self.variance = \
+            data.add(
+                data.multiply_scalar(self.beta2, self.variance),
+                data.multiply_scalar(1 - self.beta2, data.square(gradients)),
+            )
+        step = data.divide(self.mean, data.add_scalar(self.epsilon, data.sqrt(self.variance)))
+        return data.subtract(parameters, data.multiply_scalar(learning_rate, step))
+
+def run(leaves, size, steps):
+    parameters = make_tree(leaves, size)
+    gradients = make_tree(leaves, size)
+    results = {}
+
+    naive = NaiveAdam()
+    state = {'parameters': parameters}
+    def naive_step():
+        state['parameters'] = naive.update(state['parameters'], gradients)
+    results['naive'] = time_steps(naive_step, steps)
+
+    fused = optimizers.Adam()
+    results['fused'] = time_steps(lambda: fused.update(parameters, gradients), steps)
+
+    flat_parameters = flat.flatten(parameters)
+    flat_gradients = flat_parameters.pack(gradients)
+    flat_fused = optimizers.Adam()
+    results['flat'] = \
+        time_steps(
+            lambda: flat_fused.update(flat_parameters.buffer, flat_gradients),
+            steps,
+        )
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Optimizer benchmark')
+    parser.add_argument('--leaves', type=int, default=200)
+    parser.add_argument('--size', type=int, default=4096)
+    parser.add_argument('--steps', type=int, default=50)
+    args = parser.parse_args()
+
+    results = run(args.leaves, args.size, args.steps)
+    for name, seconds in results.items():
+        print('%-8s %10.3f ms/step' % (name, seconds * 1000))
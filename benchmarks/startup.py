@@ -0,0 +1,63 @@
+import argparse
+import os
+import subprocess
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each case runs in a fresh interpreter so that nothing is imported yet,
+# and is timed from the inside, leaving out the interpreter's own startup.
+template = '''
+import sys
+import time
+start = time.perf_counter()
+%s
+print(time.perf_counter() - start, 'mxnet' in sys.modules)
+'''
+
+trace = '''
+from cognite import expr
+from cognite import meta
+from cognite.meta import add_biases, linear, relu
+def model(params, x):
+    x.assert_shape((expr.batch, 256))
+    h = x
+    for i in range(3):
+        params['w%d' % i].assert_shape((256, 256))
+        h = relu(add_biases(linear(h, params['w%d' % i]), params['b%d' % i]))
+    return h
+meta.differentiable_function(model)
+'''
+
+cases = [
+    ('mxnet', 'import mxnet'),
+    ('cognite.meta', 'import cognite.meta'),
+    ('cognite.train', 'import cognite.train'),
+    ('trace', trace),
+]
+
+def time_import(code):
+    output = subprocess.run(
+        [sys.executable, '-c', template % code],
+        cwd=root,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.split()
+    return float(output[-2]), output[-1] == 'True'
+
+def measure(repeats):
+    for name, code in cases:
+        timings = [time_import(code) for i in range(repeats)]
+        yield name, min(seconds for seconds, loaded in timings), timings[0][1]
+
+def run(repeats):
+    return {'startup/%s' % name: seconds for name, seconds, loaded in measure(repeats)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Import and cold start times')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, seconds, loaded in measure(args.repeats):
+        print('%-20s %10.3f ms%s' % (name, seconds * 1000, ' loads mxnet' if loaded else ''))
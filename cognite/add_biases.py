@@ -1,36 +1,62 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class AddBiases(expr.Function):
+    supports_out = True
+
+    # The axis counts from the end, so biases broadcast against the
+    # trailing dimensions whatever the rank of the activations.
+    def __init__(self, axis=-1):
+        assert axis < 0
+        self.axis = axis
+
+    def expand(self, biases):
+        if self.axis == -1:
+            return biases
+        return biases.reshape((-1,) + (1,) * (-self.axis - 1))
+
     def forward(self, args):
         activations, biases = args
 
-        output = mx.ndarray.broadcast_add(activations, biases)
+        output = mx.ndarray.broadcast_add(activations, self.expand(biases))
         def backward(gradients):
+            ndim = len(gradients.shape)
+            axis = ndim + self.axis
             summed_gradients = \
-                mx.ndarray.sum(gradients, axis=tuple(range(len(gradients.shape)-1)))
+                mx.ndarray.sum(gradients, axis=tuple(i for i in range(ndim) if i != axis))
             return (gradients, summed_gradients)
         return output, backward
 
+    def infer(self, args, out=None):
+        activations, biases = args
+        return mx.ndarray.broadcast_add(activations, self.expand(biases), out=out)
+
+    def symbol(self, args):
+        activations, biases = args
+        if self.axis != -1:
+            biases = mx.symbol.reshape(biases, shape=(-1,) + (1,) * (-self.axis - 1))
+        return mx.symbol.broadcast_add(activations, biases)
+
     def assert_output_shape(self, args, shape):
         a, b = args
         a.assert_shape(shape)
-        biases_shape = (shape[-1],)
+        biases_shape = (shape[self.axis],)
         b.assert_shape(biases_shape)
         b.set_initializer(lambda : mx.nd.zeros(biases_shape))
 
     def get_output_shape(self, args):
         a, b = args
         shape = a.get_shape()
-        biases_shape = (shape[-1],)
+        biases_shape = (shape[self.axis],)
         b.assert_shape(biases_shape)
         b.set_initializer(lambda : mx.nd.zeros(biases_shape))
         return shape
 
 add_biases_fn = AddBiases()
 
-def add_biases(x, biases):
+def add_biases(x, biases, axis=-1):
+    function = add_biases_fn if axis == -1 else AddBiases(axis)
     if isinstance(x, expr.Constant) and isinstance(biases, expr.Constant):
-        return expr.Constant(add_biases_fn.forward([x.value, biases.value])[0])
+        return expr.Constant(function.forward([x.value, biases.value])[0])
     else:
-        return expr.Apply(add_biases_fn, [x, biases])
+        return expr.Apply(function, [x, biases])
@@ -1,5 +1,5 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 def broadcasted_dims(fr, to):
     assert len(to) >= len(fr)
@@ -14,6 +14,8 @@ def broadcasted_dims(fr, to):
     return dims
 
 class Broadcast(expr.Function):
+    supports_out = True
+
     def __init__(self, shape=None):
         self.shape = shape
 
@@ -21,13 +23,38 @@ class Broadcast(expr.Function):
         assert len(args) == 1
         x = args[0]
 
-        output = x.broadcast_to(self.shape)
+        shape = expr.resolve(self.shape)
+        if len(x.shape) < len(shape):
+            output = x.reshape((1,) * (len(shape) - len(x.shape)) + x.shape).broadcast_to(shape)
+        else:
+            output = x.broadcast_to(shape)
         def backward(gradient):
-            dims = broadcasted_dims(x.shape, self.shape)
+            dims = broadcasted_dims(x.shape, shape)
+            if not dims:
+                return (mx.ndarray.reshape(gradient, x.shape),)
             values = mx.ndarray.sum(gradient, axis=dims, keepdims=True)
             return (mx.ndarray.reshape(values, x.shape),)
         return output, backward
 
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        x = args[0]
+        shape = expr.resolve(self.shape)
+        if len(x.shape) < len(shape):
+            x = x.reshape((1,) * (len(shape) - len(x.shape)) + x.shape)
+        return mx.ndarray.broadcast_to(x, shape=shape, out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        # The argument's rank isn't known here, and unlike broadcast_to,
+        # broadcast_add also adds the leading axes it lacks. The zeros are
+        # made from one of its elements so that they share its type.
+        shape = expr.resolve(self.shape)
+        x = args[0]
+        zero = mx.symbol.zeros_like(mx.symbol.slice_axis(mx.symbol.reshape(x, shape=(-1,)), axis=0, begin=0, end=1))
+        zeros = mx.symbol.broadcast_to(mx.symbol.reshape(zero, shape=(1,) * len(shape)), shape=shape)
+        return mx.symbol.broadcast_add(x, mx.symbol.BlockGrad(zeros))
+
     def assert_output_shape(self, args, shape):
         assert len(args) == 1
         x = args[0]
@@ -0,0 +1,125 @@
+from cognite import expr
+import math
+
+class Checkpoint(expr.Function):
+    def __init__(self, parameters, body, compile):
+        self.parameters = parameters
+        self.body = body
+        self.compile = compile
+        self.compiled = None
+
+    @property
+    def function(self):
+        # Compiled on first use so that the segment's input shapes,
+        # including symbolic ones, are known by then.
+        if self.compiled is None:
+            self.compiled = self.compile(self.parameters, self.body)
+        return self.compiled
+
+    def forward(self, args):
+        (output,) = self.function.infer(*args)
+        def backward(gradients):
+            outputs, back = self.function(*args)
+            return back(gradients)
+        return output, backward
+
+    def infer(self, args, out=None):
+        assert out is None
+        return self.function.infer(*args)[0]
+
+    def get_output_shape(self, args):
+        for parameter, arg in zip(self.parameters, args):
+            parameter.assert_shape(arg.get_shape())
+        return self.body.get_shape()
+
+    def assert_output_shape(self, args, shape):
+        for parameter, arg in zip(self.parameters, args):
+            try:
+                parameter.assert_shape(arg.get_shape())
+            except expr.ShapeError:
+                pass
+        self.body.assert_shape(shape)
+        for parameter, arg in zip(self.parameters, args):
+            try:
+                arg.assert_shape(parameter.get_shape())
+            except expr.ShapeError:
+                pass
+
+    def __repr__(self):
+        return "Checkpoint(%s)" % repr(self.body)
+
+def is_checkpoint(e):
+    return isinstance(e, expr.Apply) and isinstance(e.function, Checkpoint)
+
+def segment_inputs(root):
+    inputs = []
+    seen = set()
+    stack = [root]
+    while stack:
+        e = stack.pop()
+        if e in seen:
+            continue
+        seen.add(e)
+        if isinstance(e, (expr.Variable, expr.Index)) or (is_checkpoint(e) and e is not root):
+            inputs.append(e)
+        else:
+            stack.extend(reversed(e.children))
+    return inputs
+
+def substitute(root, mapping):
+    stack = [(root, False)]
+    while stack:
+        e, expanded = stack.pop()
+        if e in mapping:
+            continue
+        if not isinstance(e, expr.Apply):
+            mapping[e] = e
+        elif expanded:
+            mapping[e] = expr.Apply(e.function, [mapping[arg] for arg in e.args])
+        else:
+            stack.append((e, True))
+            stack.extend((arg, False) for arg in e.args if not arg in mapping)
+    return mapping[root]
+
+def checkpoint(e, compile):
+    if not isinstance(e, expr.Apply) or is_checkpoint(e):
+        return e
+    inputs = segment_inputs(e)
+    parameters = []
+    mapping = {}
+    for i, x in enumerate(inputs):
+        parameter = expr.Variable('segment_input%d' % i)
+        # Segments are cut after shapes have been inferred, so the inputs'
+        # shapes are passed on here. Symbolic dimensions in them are what
+        # the segment's own function binds when it runs.
+        try:
+            parameter.assert_shape(x.get_shape())
+        except expr.ShapeError:
+            pass
+        parameters.append(parameter)
+        mapping[x] = parameter
+    body = substitute(e, mapping)
+    return expr.Apply(Checkpoint(parameters, body, compile), inputs)
+
+def segment(body, compile, every=None):
+    exprs = expr.topological_sort(body)
+    applies = [e for e in exprs if isinstance(e, expr.Apply)]
+    if every is None:
+        every = max(1, int(math.sqrt(len(applies))))
+    boundaries = set(applies[every-1::every])
+    boundaries.discard(body)
+
+    mapping = {}
+    for e in exprs:
+        if isinstance(e, expr.Apply):
+            args = [mapping[arg] for arg in e.args]
+            if any(new is not old for new, old in zip(args, e.args)):
+                new = expr.Apply(e.function, args)
+            else:
+                new = e
+            if e in boundaries:
+                new = checkpoint(new, compile)
+            mapping[e] = new
+        else:
+            mapping[e] = e
+    return mapping[body]
@@ -1,5 +1,5 @@
-import mxnet as mx
 from cognite import data
+from cognite import profiler
 
 class Combinator:
     pass
@@ -23,6 +23,10 @@ class Identity(Combinator):
             return tuple(gradients)
         return tuple(scope), backwards
 
+    def infer(self, *scope):
+        assert len(scope) == self.n
+        return scope
+
     def __repr__(self):
         return "Identity(%i)" % self.n
 
@@ -52,6 +56,11 @@ class Serial(Combinator):
             return intermediate
         return intermediate, backward
 
+    def infer(self, *scope):
+        for fn in self.xs:
+            scope = fn.infer(*scope)
+        return scope
+
     def __repr__(self):
         return "Serial(%s)" % (', '.join(map(repr, self.xs)))
 
@@ -88,24 +97,53 @@ class Parallel(Combinator):
             return result
         return tuple([x for xs in outputs for x in xs]), backward
 
+    def infer(self, *scope):
+        outputs = []
+        for x in self.xs:
+            outputs.extend(x.infer(*scope[:x.inputs]))
+            scope = scope[x.inputs:]
+        assert len(scope) == 0
+        return tuple(outputs)
+
     def __repr__(self):
         return "Parallel(%s)" % (', '.join(map(repr, self.xs)))
 
 class Discard(Combinator):
+    def __init__(self, *mask):
+        self.mask = mask
+
     @property
     def inputs(self):
-        return 1
+        return len(self.mask)
 
     @property
     def outputs(self):
-        return 0
+        return self.mask.count(False)
 
-    def __call__(self, x):
-        def backward():
-            return data.zeros(x.shape)
-        return (), backward
+    def __call__(self, *scope):
+        assert len(scope) == len(self.mask)
+        def backward(*gradients):
+            gradients = iter(gradients)
+            output = []
+            for discarded in self.mask:
+                output.append(data.zero if discarded else next(gradients))
+            return tuple(output)
+        return tuple(x for x, discarded in zip(scope, self.mask) if not discarded), backward
+
+    def infer(self, *scope):
+        assert len(scope) == len(self.mask)
+        return tuple(x for x, discarded in zip(scope, self.mask) if not discarded)
+
+    def __repr__(self):
+        return "Discard(%s)" % (', '.join(map(repr, self.mask)))
 
 class Duplicate(Combinator):
+    def __init__(self, reuse_buffers=False):
+        if reuse_buffers:
+            self.accumulate = data.Accumulator()
+        else:
+            self.accumulate = data.add
+
     @property
     def inputs(self):
         return 1
@@ -116,9 +154,12 @@ class Duplicate(Combinator):
 
     def __call__(self, x):
         def backward(a, b):
-            return (data.add(a, b),)
+            return (self.accumulate(a, b),)
         return (x, x), backward
 
+    def infer(self, x):
+        return (x, x)
+
     def __repr__(self):
         return "Duplicate()"
 
@@ -126,9 +167,9 @@ class Permutation(Combinator):
     def __init__(self, *indices):
         assert list(sorted(indices)) == list(range(len(indices)))
         self.indices = indices
-        self.inverse = []
-        for i in range(len(self.indices)):
-            self.inverse.append(self.indices.index(i))
+        self.inverse = [0] * len(indices)
+        for i, index in enumerate(indices):
+            self.inverse[index] = i
 
     @property
     def inputs(self):
@@ -150,6 +191,10 @@ class Permutation(Combinator):
             return tuple(output)
         return tuple(output), backward
 
+    def infer(self, *scope):
+        assert len(scope) == len(self.indices)
+        return tuple(scope[index] for index in self.indices)
+
     def __repr__(self):
         return "Permutation(%s)" % (', '.join(map(str, self.indices)))
 
@@ -168,8 +213,21 @@ class Apply(Combinator):
 
     def __call__(self, *scope):
         assert len(scope) == self.n
-        output, back = self.function.forward(scope)
-        return (output,), back
+        if profiler.current is None:
+            output, back = self.function.forward(scope)
+        else:
+            output, back = profiler.current.forward(self, self.function, scope)
+        def backward(gradients):
+            if gradients is data.zero:
+                return (data.zero,) * self.n
+            return back(gradients)
+        return (output,), backward
+
+    def infer(self, *scope):
+        assert len(scope) == self.n
+        if profiler.current is None:
+            return (self.function.infer(scope),)
+        return (profiler.current.infer(self, self.function, scope),)
 
     def __repr__(self):
         return "Apply(%s, %d)" % (repr(self.function), self.n)
@@ -188,9 +246,14 @@ class Index(Combinator):
 
     def __call__(self, value):
         def back(gradients):
+            if gradients is data.zero:
+                return (data.zero,)
             return ({self.attr: gradients},)
         return (value[self.attr],), back
 
+    def infer(self, value):
+        return (value[self.attr],)
+
     def __repr__(self):
         return "Index(%s)" % self.attr
 
@@ -211,5 +274,8 @@ class Constant(Combinator):
             return ()
         return (self.value,), back
 
+    def infer(self):
+        return (self.value,)
+
     def __repr__(self):
         return "Constant()"
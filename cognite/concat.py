@@ -1,36 +1,52 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Concat(expr.Function):
+    supports_out = True
+
     def __init__(self, axis):
         self.axis = axis
 
     def forward(self, args):
-        output = mx.ndarray.concat(args, dim=axis)
+        output = mx.ndarray.concat(*args, dim=self.axis)
         def backwards(gradients):
             outputs = []
             n = 0
             for arg in args:
-                size = arg.shape[axis]
+                size = arg.shape[self.axis]
                 begin = n
                 end = begin+size
                 n = end
                 outputs.append(
                     mx.ndarray.slice_axis(
                         gradients,
-                        axis=axis,
+                        axis=self.axis,
                         begin=begin,
                         end=end,
                     )
                 )
-            return outputs
+            return tuple(outputs)
         return output, backwards
 
+    def infer(self, args, out=None):
+        return mx.ndarray.concat(*args, dim=self.axis, out=out)
+
+    def symbol(self, args):
+        return mx.symbol.concat(*args, dim=self.axis)
+
     def get_output_shape(self, args):
-        raise NotImplementedError()
+        shapes = [arg.get_shape() for arg in args]
+        axis = self.axis % len(shapes[0])
+        for shape in shapes:
+            others = [x for i, x in enumerate(shape) if i != axis]
+            if len(shape) != len(shapes[0]) or others != [x for i, x in enumerate(shapes[0]) if i != axis]:
+                raise expr.ShapeError('Cannot concatenate %s along axis %d' % (shapes, self.axis))
+        output = list(shapes[0])
+        output[axis] = sum(shape[axis] for shape in shapes)
+        return tuple(output)
 
 def concat(args, axis):
-    if all(lambda x: isinstance(expr.Constant), args):
-        return expr.Constant(Concat(axis).forward(map(lambda x: x.value, args)))
+    if all(isinstance(arg, expr.Constant) for arg in args):
+        return expr.Constant(Concat(axis).infer([arg.value for arg in args]))
     else:
-        return expr.Apply(Concat(axis), [args])
+        return expr.Apply(Concat(axis), args)
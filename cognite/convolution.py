@@ -1,69 +1,217 @@
 from cognite import expr
 import math
-import mxnet as mx
+from cognite.lazy import mx
 
-def convolution(activations, weight):
+# Activations are either NHWC, as seen by callers, or NCHW, as MXNet's
+# kernels expect them. Weights are always HWIO.
+to_nchw = (0, 3, 1, 2)
+to_nhwc = (0, 2, 3, 1)
+
+def check_layout(layout):
+    if not layout in ('NHWC', 'NCHW'):
+        raise ValueError('unknown layout %s' % layout)
+
+def pair(x):
+    if isinstance(x, int):
+        return (x, x)
+    return tuple(x)
+
+def output_size(size, kernel, stride, pad, dilate):
+    return (size + 2*pad - dilate*(kernel - 1) - 1) // stride + 1
+
+def convolution(activations, weight, layout='NHWC', stride=(1, 1), pad=(0, 0), dilate=(1, 1), out=None):
     height, width, channels_in, channels_out = weight.shape
     weight = mx.ndarray.transpose(weight, axes=(3, 2, 0, 1))
-    activations = mx.ndarray.transpose(activations, axes= (0, 3, 1, 2))
+    if layout == 'NCHW':
+        return \
+            mx.ndarray.Convolution(
+                kernel = (height, width),
+                stride = stride,
+                pad = pad,
+                dilate = dilate,
+                num_filter = channels_out,
+                data = activations,
+                weight = weight,
+                no_bias = True,
+                out = out,
+            )
+    activations = mx.ndarray.transpose(activations, axes=to_nchw)
     output = \
         mx.ndarray.Convolution(
             kernel = (height, width),
+            stride = stride,
+            pad = pad,
+            dilate = dilate,
             num_filter = channels_out,
             data = activations,
             weight = weight,
             no_bias = True,
         )
-    return mx.ndarray.transpose(output, axes=(0, 2, 3, 1))
+    return mx.ndarray.transpose(output, axes=to_nhwc, out=out)
 
-def convolution_input_gradient(delta, weight):
+def spread(delta, stride, size):
+    # Puts stride - 1 zeros after every row and column, the gradient a
+    # strided convolution's output sends back to the positions it skipped.
+    batch_size, channels, height, width = delta.shape
+    delta = delta.reshape((batch_size, channels, height, 1, width, 1))
+    if stride[0] > 1:
+        zeros = \
+            mx.ndarray.zeros(
+                (batch_size, channels, height, stride[0] - 1, width, 1),
+                ctx = delta.context,
+                dtype = delta.dtype,
+            )
+        delta = mx.ndarray.concat(delta, zeros, dim=3)
+    if stride[1] > 1:
+        zeros = \
+            mx.ndarray.zeros(
+                (batch_size, channels, height, stride[0], width, stride[1] - 1),
+                ctx = delta.context,
+                dtype = delta.dtype,
+            )
+        delta = mx.ndarray.concat(delta, zeros, dim=5)
+    delta = delta.reshape((batch_size, channels, height * stride[0], width * stride[1]))
+    return delta[:, :, :size[0], :size[1]]
+
+def convolution_input_gradient(delta, weight, input_shape, layout='NHWC', stride=(1, 1), pad=(0, 0), dilate=(1, 1)):
     height, width, channels_in, channels_out = weight.shape
-    delta = mx.ndarray.transpose(delta, axes=(0, 3, 1, 2))
+    if layout == 'NHWC':
+        delta = mx.ndarray.transpose(delta, axes=to_nchw)
+        input_size = input_shape[1:3]
+    else:
+        input_size = input_shape[2:4]
+    # A strided convolution ignores the last (size + 2*pad - kernel) %
+    # stride rows and columns, which the transpose has to add back.
+    adj = tuple(
+        (size + 2*p - d*(k - 1) - 1) % s
+        for size, k, s, p, d in zip(input_size, (height, width), stride, pad, dilate)
+    )
+    # MXNet's Deconvolution is wrong when it is both strided and dilated,
+    # so then the stride is applied beforehand and the transpose has none.
+    if stride != (1, 1) and dilate != (1, 1):
+        delta = \
+            spread(
+                delta,
+                stride,
+                [(n - 1) * s + 1 + a for n, s, a in zip(delta.shape[2:], stride, adj)],
+            )
+        stride = (1, 1)
+        adj = (0, 0)
     weight = mx.ndarray.transpose(weight, axes=(3, 2, 0, 1))
     input_gradient = \
         mx.ndarray.Deconvolution(
             kernel = (height, width),
+            stride = stride,
+            pad = pad,
+            dilate = dilate,
+            adj = adj,
             num_filter = channels_in,
             data = delta,
             weight = weight,
             no_bias = True,
         )
-    return mx.ndarray.transpose(input_gradient, axes=(0, 2, 3, 1))
+    if layout == 'NHWC':
+        return mx.ndarray.transpose(input_gradient, axes=to_nhwc)
+    return input_gradient
 
-def convolution_weight_gradient(delta, activations):
-    batch_size, height, width, channels = delta.shape
-    delta = mx.ndarray.transpose(delta, axes=(3, 0, 1, 2))
-    activations = mx.ndarray.transpose(activations, axes=(3, 0, 1, 2))
+def convolution_weight_gradient(delta, activations, kernel, layout='NHWC', stride=(1, 1), pad=(0, 0), dilate=(1, 1)):
+    # The batch becomes the reduced channel dimension, so both tensors
+    # need their channels first whichever layout they arrive in.
+    if layout == 'NHWC':
+        batch_size, height, width, channels = delta.shape
+        axes = (3, 0, 1, 2)
+    else:
+        batch_size, channels, height, width = delta.shape
+        axes = (1, 0, 2, 3)
+    delta = mx.ndarray.transpose(delta, axes=axes)
+    activations = mx.ndarray.transpose(activations, axes=axes)
+    # Each output position steps through the input by the stride and each
+    # kernel tap by the dilation, so here the two swap roles. Rows the
+    # forward pass never reached can make the result larger than the
+    # kernel.
     weight_gradient = \
         mx.ndarray.Convolution(
             kernel = (height, width),
+            stride = dilate,
+            pad = pad,
+            dilate = stride,
             num_filter = channels,
             data = activations,
             weight = delta,
             no_bias = True,
         )
+    weight_gradient = weight_gradient[:, :, :kernel[0], :kernel[1]]
     return mx.ndarray.transpose(weight_gradient, axes=(2, 3, 0, 1))
 
 class Convolution(expr.Function):
-    def __init__(self, kernel, outputs):
-        self.kernel = kernel
+    supports_out = True
+
+    def __init__(self, kernel, outputs, layout='NHWC', stride=1, pad=0, dilate=1):
+        check_layout(layout)
+        self.kernel = pair(kernel)
         self.outputs = outputs
+        self.layout = layout
+        self.stride = pair(stride)
+        self.pad = pair(pad)
+        self.dilate = pair(dilate)
+
+    @property
+    def options(self):
+        return {'stride': self.stride, 'pad': self.pad, 'dilate': self.dilate}
 
     def forward(self, args):
         activations, weights = args
-        output = convolution(activations, weights)
+        output = convolution(activations, weights, self.layout, **self.options)
         def backwards(gradients):
-            activation_gradients = convolution_input_gradient(gradients, weights)
-            weight_gradients = convolution_weight_gradient(gradients, activations)
+            activation_gradients = \
+                convolution_input_gradient(
+                    gradients,
+                    weights,
+                    activations.shape,
+                    self.layout,
+                    **self.options
+                )
+            weight_gradients = \
+                convolution_weight_gradient(
+                    gradients,
+                    activations,
+                    self.kernel,
+                    self.layout,
+                    **self.options
+                )
             return (activation_gradients, weight_gradients)
         return output, backwards
 
+    def infer(self, args, out=None):
+        activations, weights = args
+        return convolution(activations, weights, self.layout, out=out, **self.options)
+
+    def symbol(self, args):
+        activations, weights = args
+        if self.layout == 'NHWC':
+            activations = mx.symbol.transpose(activations, axes=to_nchw)
+        output = \
+            mx.symbol.Convolution(
+                kernel = self.kernel,
+                num_filter = self.outputs,
+                data = activations,
+                weight = mx.symbol.transpose(weights, axes=(3, 2, 0, 1)),
+                no_bias = True,
+                **self.options
+            )
+        if self.layout == 'NHWC':
+            return mx.symbol.transpose(output, axes=to_nhwc)
+        return output
+
     def get_output_shape(self, args):
         activations, weights = args
         act_shape = activations.get_shape()
         if len(act_shape) != 4:
-            raise expr.ShapeError('expected activations to be 4D, DHWC')
-        batch, height, width, in_channels = activations.get_shape()
+            raise expr.ShapeError('expected activations to be 4D, %s' % self.layout)
+        if self.layout == 'NHWC':
+            batch, height, width, in_channels = act_shape
+        else:
+            batch, in_channels, height, width = act_shape
         filter_height, filter_width = self.kernel
         weight_shape = (filter_height, filter_width, in_channels, self.outputs)
         weights.assert_shape(weight_shape)
@@ -71,10 +219,18 @@ class Convolution(expr.Function):
         initializer = \
             lambda : mx.nd.random_normal(scale=scale, shape=weight_shape)
         weights.set_initializer(initializer)
-        return (batch, height - filter_height + 1, width - filter_width + 1, self.outputs)
+        output_height, output_width = (
+            output_size(size, k, s, p, d)
+            for size, k, s, p, d in zip((height, width), self.kernel, self.stride, self.pad, self.dilate)
+        )
+        if output_height < 1 or output_width < 1:
+            raise expr.ShapeError('%s is too small for a %s kernel' % (act_shape, self.kernel))
+        if self.layout == 'NHWC':
+            return (batch, output_height, output_width, self.outputs)
+        return (batch, self.outputs, output_height, output_width)
 
-def convolution2d(x, weights, kernel, outputs):
-    conv = Convolution(kernel, outputs)
+def convolution2d(x, weights, kernel, outputs, layout='NHWC', stride=1, pad=0, dilate=1):
+    conv = Convolution(kernel, outputs, layout, stride, pad, dilate)
     if isinstance(x, expr.Constant) and isinstance(weights, expr.Constant):
         return expr.Constant(conv.forward([x.value, weights.value])[0])
     else:
@@ -1,44 +1,105 @@
+import collections.abc
 import functools
-import mxnet as mx
+from cognite.lazy import mx
+from cognite.lazy import np
 import operator
 import struct
 
-def unary_elementwise(x, fn):
-    if isinstance(x, dict):
+class Zero:
+    def __repr__(self):
+        return "zero"
+
+zero = Zero()
+
+def unary_elementwise(x, fn, preserves_zero=True):
+    if x is zero:
+        if not preserves_zero:
+            raise TypeError('operation does not map zero to zero')
+        return zero
+    elif isinstance(x, collections.abc.Mapping):
         output = {}
         for key, value in x.items():
-            output[key] = unary_elementwise(value, fn)
+            output[key] = unary_elementwise(value, fn, preserves_zero)
         return output
     else:
         return fn(x)
 
-def binary_elementwise(a, b, fn):
-    assert (isinstance(a, dict) and isinstance(b, dict)) or (isinstance(a, mx.ndarray.NDArray) and isinstance(b, mx.ndarray.NDArray))
-    if isinstance(a, dict):
+def binary_elementwise(a, b, fn, on_zero):
+    if a is zero or b is zero:
+        return on_zero(a, b)
+    assert (isinstance(a, collections.abc.Mapping) and isinstance(b, collections.abc.Mapping)) or (isinstance(a, mx.ndarray.NDArray) and isinstance(b, mx.ndarray.NDArray))
+    if isinstance(a, collections.abc.Mapping):
         a_keys = set(a.keys())
         b_keys = set(b.keys())
         output = {}
         for key in a_keys - b_keys:
-            output[key] = a[key]
+            output[key] = on_zero(a[key], zero)
         for key in b_keys - a_keys:
-            output[key] = b[key]
+            output[key] = on_zero(zero, b[key])
         for key in a_keys & b_keys:
-            output[key] = binary_elementwise(a[key], b[key], fn)
+            output[key] = binary_elementwise(a[key], b[key], fn, on_zero)
         return output
     else:
         return fn(a, b)
 
+def add_zero(a, b):
+    return b if a is zero else a
+
+def subtract_zero(a, b):
+    return a if b is zero else multiply_scalar(-1, b)
+
+def multiply_zero(a, b):
+    return zero
+
+def divide_zero(a, b):
+    if b is zero:
+        raise ZeroDivisionError('division by a structural zero')
+    return zero
+
 def add(a, b):
-    return binary_elementwise(a, b, mx.ndarray.add)
+    return binary_elementwise(a, b, mx.ndarray.add, add_zero)
+
+# Sums into one buffer per key path and shape, kept from call to call, so
+# fan-out points stop allocating after the first backward pass. What it
+# returns is that buffer: a gradient kept from one backward pass through a
+# function built with reuse_buffers is overwritten by the next one, and
+# has to be copied to outlive it.
+class Accumulator:
+    def __init__(self):
+        self.buffers = {}
+
+    def __call__(self, a, b, path=()):
+        if a is zero:
+            return b
+        if b is zero:
+            return a
+        if isinstance(a, collections.abc.Mapping):
+            assert isinstance(b, collections.abc.Mapping)
+            output = {}
+            for key in a.keys() - b.keys():
+                output[key] = a[key]
+            for key in b.keys() - a.keys():
+                output[key] = b[key]
+            for key in a.keys() & b.keys():
+                output[key] = self(a[key], b[key], path + (key,))
+            return output
+        assert a.shape == b.shape
+        key = (path, a.shape)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = mx.ndarray.empty(a.shape, ctx=a.context, dtype=a.dtype)
+            self.buffers[key] = buffer
+        mx.ndarray.elemwise_add(a, b, out=buffer)
+        return buffer
 
 def subtract(a, b):
-    return binary_elementwise(a, b, mx.ndarray.subtract)
+    return binary_elementwise(a, b, mx.ndarray.subtract, subtract_zero)
 
 def multiply(a, b):
-    return binary_elementwise(a, b, mx.ndarray.multiply)
+    return binary_elementwise(a, b, mx.ndarray.multiply, multiply_zero)
 
 def divide(a, b):
-    return binary_elementwise(a, b, mx.ndarray.divide)
+    return binary_elementwise(a, b, mx.ndarray.divide, divide_zero)
 
 def square(x):
     return unary_elementwise(x, mx.ndarray.square)
@@ -47,7 +108,7 @@ def sqrt(x):
     return unary_elementwise(x, mx.ndarray.sqrt)
 
 def add_scalar(scalar, x):
-    return unary_elementwise(x, lambda x: mx.ndarray.add(scalar, x))
+    return unary_elementwise(x, lambda x: mx.ndarray.add(scalar, x), preserves_zero=False)
 
 def multiply_scalar(scalar, x):
     return unary_elementwise(x, lambda x: mx.ndarray.multiply(scalar, x))
@@ -61,10 +122,13 @@ def zeros(shape):
     else:
         return mx.ndarray.zeros(shape)
 
+def zeros_like(x):
+    return unary_elementwise(x, mx.ndarray.zeros_like)
+
 def check(data):
-    if isinstance(data, mx.ndarray.NDArray):
+    if data is zero or isinstance(data, mx.ndarray.NDArray):
         return True
-    elif isinstance(data, dict):
+    elif isinstance(data, collections.abc.Mapping):
         return \
             all(map(lambda x: isinstance(x, str), data.keys())) and \
             all(map(check, data.values()))
@@ -72,7 +136,7 @@ def check(data):
         return False
 
 def dump(data, fd):
-    if isinstance(data, dict):
+    if isinstance(data, collections.abc.Mapping):
         fd.write(struct.pack('!B', 1))
         fd.write(struct.pack('!Q', len(data)))
         for key, value in data.items():
@@ -82,40 +146,123 @@ def dump(data, fd):
             fd.write(key_bytes)
             dump(value, fd)
     elif isinstance(data, mx.ndarray.NDArray):
-        fd.write(struct.pack('!B', 2))
-        fd.write(struct.pack('!Q', len(data.shape)))
-        for x in data.shape:
-            fd.write(struct.pack('!Q', x))
-        size = functools.reduce(operator.mul, data.shape, 1)
-        values = data.reshape((size,))
-        for value in values.asnumpy():
-            fd.write(struct.pack('!f', value))
+        values = np.ascontiguousarray(data.asnumpy())
+        dtype = values.dtype.str.encode('ascii')
+        fd.write(struct.pack('!B', 3))
+        fd.write(struct.pack('!B', len(dtype)))
+        fd.write(dtype)
+        fd.write(struct.pack('!Q', len(values.shape)))
+        fd.write(struct.pack('!%dQ' % len(values.shape), *values.shape))
+        fd.write(values.data)
     else:
         raise TypeError('not dumpable')
 
+def read_exactly(fd, n):
+    output = fd.read(n)
+    if len(output) != n:
+        raise EOFError('expected %d bytes, but got %d' % (n, len(output)))
+    return output
+
+def read_shape(fd):
+    n = struct.unpack('!Q', read_exactly(fd, 8))[0]
+    return struct.unpack('!%dQ' % n, read_exactly(fd, 8*n))
+
 def load(fd):
-    t = struct.unpack('!B', fd.read(1))[0]
+    t = struct.unpack('!B', read_exactly(fd, 1))[0]
     if t == 1:
-        n = struct.unpack('!Q', fd.read(8))[0]
+        n = struct.unpack('!Q', read_exactly(fd, 8))[0]
         output = {}
         for i in range(n):
-            n = struct.unpack('!Q', fd.read(8))[0]
-            key = fd.read(n).decode('utf8')
+            m = struct.unpack('!Q', read_exactly(fd, 8))[0]
+            key = read_exactly(fd, m).decode('utf8')
             value = load(fd)
             output[key] = value
         return output
     elif t == 2:
-        n = struct.unpack('!Q', fd.read(8))[0]
-        size = 1
-        shape = []
+        shape = read_shape(fd)
+        size = functools.reduce(operator.mul, shape, 1)
+        values = np.frombuffer(read_exactly(fd, 4*size), dtype='>f4')
+        return mx.ndarray.array(values.reshape(shape), dtype=np.float32)
+    elif t == 3:
+        n = struct.unpack('!B', read_exactly(fd, 1))[0]
+        dtype = np.dtype(read_exactly(fd, n).decode('ascii'))
+        shape = read_shape(fd)
+        size = functools.reduce(operator.mul, shape, 1)
+        values = np.frombuffer(read_exactly(fd, dtype.itemsize*size), dtype=dtype)
+        return mx.ndarray.array(values.reshape(shape), dtype=dtype.newbyteorder('='))
+    else:
+        raise TypeError('unknown data type')
+
+Entry = collections.namedtuple('Entry', ['dtype', 'shape', 'offset'])
+
+def scan(fd):
+    t = struct.unpack('!B', read_exactly(fd, 1))[0]
+    if t == 1:
+        n = struct.unpack('!Q', read_exactly(fd, 8))[0]
+        output = {}
         for i in range(n):
-            n = struct.unpack('!Q', fd.read(8))[0]
-            shape.append(n)
-            size *= n
-        values = []
-        for i in range(size):
-            f = struct.unpack('!f', fd.read(4))[0]
-            values.append(f)
-        return mx.ndarray.array(values).reshape(shape)
+            m = struct.unpack('!Q', read_exactly(fd, 8))[0]
+            key = read_exactly(fd, m).decode('utf8')
+            output[key] = scan(fd)
+        return output
+    elif t == 2:
+        dtype = np.dtype('>f4')
+        shape = read_shape(fd)
+    elif t == 3:
+        n = struct.unpack('!B', read_exactly(fd, 1))[0]
+        dtype = np.dtype(read_exactly(fd, n).decode('ascii'))
+        shape = read_shape(fd)
     else:
         raise TypeError('unknown data type')
+    size = functools.reduce(operator.mul, shape, 1)
+    offset = fd.tell()
+    fd.seek(dtype.itemsize*size, 1)
+    return Entry(dtype, shape, offset)
+
+class MappedTree(collections.abc.Mapping):
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+        self.materialized = {}
+
+    def __getitem__(self, key):
+        value = self.materialized.get(key)
+        if value is None:
+            entry = self.index[key]
+            if isinstance(entry, Entry):
+                values = \
+                    np.ndarray(
+                        entry.shape,
+                        dtype = entry.dtype,
+                        buffer = self.buffer,
+                        offset = entry.offset,
+                    )
+                value = mx.ndarray.array(values, dtype=entry.dtype.newbyteorder('='))
+            else:
+                value = MappedTree(self.buffer, entry)
+            self.materialized[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def paths(self, prefix=()):
+        for key, entry in self.index.items():
+            if isinstance(entry, Entry):
+                yield prefix + (key,), entry
+            else:
+                yield from MappedTree(self.buffer, entry).paths(prefix + (key,))
+
+    def __repr__(self):
+        return "MappedTree(%s)" % repr(sorted(self.index))
+
+def load_mapped(path):
+    with open(path, 'rb') as fd:
+        index = scan(fd)
+    if isinstance(index, Entry):
+        raise TypeError('expected a dictionary at the root of %s' % path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    return MappedTree(buffer, index)
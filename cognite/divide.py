@@ -1,18 +1,29 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Divide(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         a, b = args
 
         b_recip = mx.ndarray.reciprocal(b)
         output = mx.ndarray.multiply(a, b_recip)
         def backward(gradients):
-            b_gradient = mx.ndarray.multiply(output, b_recip)
+            a_gradient = mx.ndarray.multiply(gradients, b_recip)
+            b_gradient = mx.ndarray.multiply(output, a_gradient)
             b_gradient = mx.ndarray.multiply(-1, b_gradient)
-            return (b_recip, b_gradient)
+            return (a_gradient, b_gradient)
         return output, backward
 
+    def infer(self, args, out=None):
+        a, b = args
+        return mx.ndarray.elemwise_div(a, b, out=out)
+
+    def symbol(self, args):
+        a, b = args
+        return a / b
+
     def assert_output_shape(self, args, shape):
         a, b = args
         a.assert_shape(shape)
@@ -1,18 +1,83 @@
-import toposort
 import collections
-import mxnet as mx
+import contextlib
+import functools
+import operator
+import threading
 
 class ShapeError(Exception):
     pass
 
+class Dim:
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Dim) and other.name == self.name
+
+    def __hash__(self):
+        return hash((Dim, self.name))
+
+    def __repr__(self):
+        return self.name
+
+batch = Dim('batch')
+
+def is_symbolic(shape):
+    return any(isinstance(x, Dim) for x in shape)
+
+class Bindings(threading.local):
+    def __init__(self):
+        self.stack = [{}]
+
+bindings = Bindings()
+
+@contextlib.contextmanager
+def bind(values):
+    bindings.stack.append(values)
+    try:
+        yield
+    finally:
+        bindings.stack.pop()
+
+def resolve(shape):
+    if not is_symbolic(shape):
+        return shape
+    values = bindings.stack[-1]
+    output = []
+    for x in shape:
+        if isinstance(x, Dim):
+            if not x in values:
+                raise ShapeError('%s is not bound' % x)
+            output.append(values[x])
+        else:
+            output.append(x)
+    return tuple(output)
+
+def num_values(shape):
+    concrete = functools.reduce(operator.mul, [x for x in shape if not isinstance(x, Dim)], 1)
+    symbolic = sorted(x.name for x in shape if isinstance(x, Dim))
+    return concrete, symbolic
+
 class Function:
+    supports_out = False
+    aliases_input = False
+    # The positions of arguments, like labels, that never get a gradient.
+    nondifferentiable_args = ()
+
     def forward(self, args):
         raise NotImplementedError("not implemented for %s" % repr(type(self)))
 
+    def infer(self, args, out=None):
+        assert out is None
+        return self.forward(args)[0]
+
+    def symbol(self, args):
+        raise NotImplementedError("not implemented for %s" % repr(type(self)))
+
     def assert_output_shape(self, args, shape):
         output_shape = self.get_output_shape(args)
         if output_shape != shape:
-            raise expr.ShapeError('Expected %s, but got %s' % (shape, output_shape))
+            raise ShapeError('Expected %s, but got %s' % (shape, output_shape))
 
     def get_output_shape(self, args):
         raise NotImplementedError("not implemented for %s" % repr(type(self)))
@@ -35,16 +100,24 @@ class Apply(Expr):
     def __init__(self, function, args):
         self.function = function
         self.args = args
+        self.shape = None
 
     @property
     def children(self):
         return self.args
 
+    # Once inferred, a shape cannot change, so it's kept to avoid walking
+    # shared subexpressions again, which is exponential in residual graphs.
     def get_shape(self):
-        return self.function.get_output_shape(self.args)
+        if self.shape is None:
+            self.shape = self.function.get_output_shape(self.args)
+        return self.shape
 
     def assert_shape(self, shape):
-        self.function.assert_output_shape(self.args, shape)
+        if self.shape is None:
+            self.function.assert_output_shape(self.args, shape)
+        elif self.shape != shape:
+            raise ShapeError('Expected %s, but got %s' % (shape, self.shape))
 
     def __repr__(self):
         return "Apply(%s, %s)" % (repr(self.function), repr(self.args))
@@ -181,15 +254,34 @@ class Index(Expr):
             raise ShapeError("Shape not set for %s" % self.name)
 
 def topological_sort(root):
-    connections = {}
-    stack = [root]
+    # An iterative depth first search, so that every expression follows its
+    # children and deep graphs don't hit the recursion limit.
+    output = []
+    visited = set()
+    stack = [(root, False)]
     while stack:
-        x = stack.pop()
-        if not x in connections:
-            connections[x] = set(x.children)
-            stack.extend(x.children)
-    output = list(toposort.toposort(connections))
-    return [x for xs in output for x in xs]
+        x, expanded = stack.pop()
+        if expanded:
+            output.append(x)
+        elif not x in visited:
+            visited.add(x)
+            stack.append((x, True))
+            for child in reversed(x.children):
+                if not child in visited:
+                    stack.append((child, False))
+    return output
+
+def infer_shapes(root):
+    # Shapes are inferred from the leaves upwards first, so that each one
+    # only has to look at its arguments' cached shapes. Some may only be
+    # known once the expressions using them assert them.
+    for x in topological_sort(root):
+        if isinstance(x, Apply):
+            try:
+                x.get_shape()
+            except ShapeError:
+                pass
+    return root.get_shape()
 
 def count_references(exprs):
     refs = collections.Counter()
@@ -0,0 +1,87 @@
+from cognite import data
+import collections
+import collections.abc
+import functools
+from cognite.lazy import mx
+import operator
+
+def leaves(tree, prefix=()):
+    if isinstance(tree, collections.abc.Mapping):
+        for key in sorted(tree):
+            yield from leaves(tree[key], prefix + (key,))
+    else:
+        yield prefix, tree
+
+def insert(tree, path, value):
+    for key in path[:-1]:
+        tree = tree.setdefault(key, {})
+    tree[path[-1]] = value
+
+class Layout:
+    def __init__(self, tree):
+        self.index = collections.OrderedDict()
+        self.size = 0
+        for path, leaf in leaves(tree):
+            if not path:
+                raise TypeError('expected a dictionary of arrays')
+            size = functools.reduce(operator.mul, leaf.shape, 1)
+            self.index[path] = (self.size, self.size + size, tuple(leaf.shape))
+            self.size += size
+
+    def views(self, buffer):
+        assert buffer.shape == (self.size,)
+        output = {}
+        for path, (begin, end, shape) in self.index.items():
+            insert(output, path, buffer[begin:end].reshape(shape))
+        return output
+
+    def pack(self, tree, dtype='float32', ctx=None):
+        parts = []
+        for path, (begin, end, shape) in self.index.items():
+            value = tree
+            for key in path:
+                if value is data.zero:
+                    break
+                value = value.get(key, data.zero)
+            if value is data.zero:
+                parts.append(mx.ndarray.zeros((end - begin,), ctx=ctx, dtype=dtype))
+            else:
+                if value.shape != shape:
+                    raise ValueError('expected %s to have shape %s, but got %s' % (repr(path), shape, value.shape))
+                parts.append(value.reshape((end - begin,)))
+        if not parts:
+            return mx.ndarray.zeros((0,), ctx=ctx, dtype=dtype)
+        return mx.ndarray.concat(*parts, dim=0)
+
+    def __repr__(self):
+        return "Layout(%s)" % ', '.join(repr(path) for path in self.index)
+
+class FlatParameters:
+    def __init__(self, layout, buffer):
+        self.layout = layout
+        self.buffer = buffer
+        self.tree = layout.views(buffer)
+
+    def pack(self, tree):
+        return self.layout.pack(tree, self.buffer.dtype, self.buffer.context)
+
+    def dump(self, fd):
+        data.dump(self.buffer, fd)
+
+    def __repr__(self):
+        return "FlatParameters(%s)" % repr(self.layout)
+
+def flatten(tree):
+    layout = Layout(tree)
+    arrays = [leaf for path, leaf in leaves(tree)]
+    if arrays:
+        buffer = layout.pack(tree, arrays[0].dtype, arrays[0].context)
+    else:
+        buffer = layout.pack(tree)
+    return FlatParameters(layout, buffer)
+
+def load(layout, fd):
+    buffer = data.load(fd)
+    if buffer.shape != (layout.size,):
+        raise ValueError('expected a buffer of %d values, but got %s' % (layout.size, buffer.shape))
+    return FlatParameters(layout, buffer)
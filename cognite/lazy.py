@@ -0,0 +1,21 @@
+import importlib
+
+# Stands in for a module that is only imported the first time one of its
+# attributes is used, so that building graphs, inferring shapes and
+# lowering them doesn't pay for starting MXNet.
+class Module:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        # Copying the module's attributes in means later lookups don't come
+        # through here again, and cost the same as on the module itself.
+        self.__dict__.update(vars(module))
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return "lazy.Module(%s)" % self._name
+
+mx = Module('mxnet')
+np = Module('numpy')
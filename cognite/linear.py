@@ -1,7 +1,9 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Linear(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         activations, weights = args
         output = mx.ndarray.dot(activations, weights)
@@ -11,6 +13,14 @@ class Linear(expr.Function):
             return (activation_gradients, weight_gradients)
         return output, backwards
 
+    def infer(self, args, out=None):
+        activations, weights = args
+        return mx.ndarray.dot(activations, weights, out=out)
+
+    def symbol(self, args):
+        activations, weights = args
+        return mx.symbol.dot(activations, weights)
+
     def assert_output_shape(self, args, shape):
         activations, weights = args
         batch, output_size = shape
@@ -1,7 +1,9 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Mean(expr.Function):
+    supports_out = True
+
     def __init__(self, dims):
         assert isinstance(dims, tuple)
         self.dims = dims
@@ -18,6 +20,14 @@ class Mean(expr.Function):
         output = mx.ndarray.mean(values, self.dims, keepdims=True)
         return output, backwards
 
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        return mx.ndarray.mean(args[0], axis=self.dims, keepdims=True, out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.mean(args[0], axis=self.dims, keepdims=True)
+
     def get_output_shape(self, args):
         assert len(args) == 1
         values = args[0]
@@ -25,10 +35,10 @@ class Mean(expr.Function):
         shape = list(values.get_shape())
         for dim in self.dims:
             shape[dim] = 1
-        return shape
+        return tuple(shape)
 
 def mean(values, dims):
     if isinstance(values, expr.Constant):
-        return expr.Constant(Mean(dims).forward(values.value))
+        return expr.Constant(Mean(dims).infer([values.value]))
     else:
         return expr.Apply(Mean(dims), [values])
@@ -1,3 +1,5 @@
+import collections
+import collections.abc
 import inspect
 
 from cognite.add import add
@@ -14,145 +16,352 @@ from cognite.sigmoid import sigmoid
 from cognite.sigmoid_cross_entropy import sigmoid_cross_entropy
 from cognite.softmax import softmax
 from cognite.softmax_cross_entropy import softmax_cross_entropy
+from cognite.sparse_softmax_cross_entropy import sparse_softmax_cross_entropy
 from cognite.squared_difference import squared_difference
 from cognite.sqrt import sqrt
 from cognite.subtract import subtract
+from cognite.transpose import transpose
 from cognite.upsample import upsample
+from cognite import checkpoint as checkpointing
 from cognite import combinators
 from cognite import expr
+from cognite import passes
+from cognite import planner
+from cognite import program
+from cognite import symbol
+from cognite import tape
+
+def symbolic_leaves(index, variable, path=()):
+    if variable.shape and expr.is_symbolic(variable.shape):
+        yield index, path, variable.shape
+    for attr, descendent in variable.descendents.items():
+        yield from symbolic_leaves(index, descendent, path + (attr,))
+
+def checkpoint(e, **options):
+    return checkpointing.checkpoint(e, lambda parameters, body: Function(parameters, body, **options))
 
 class Function:
-    def __init__(self, parameters, body):
+    def __init__(
+            self,
+            parameters,
+            body,
+            backend='combinators',
+            reuse_buffers=False,
+            plan_memory=False,
+            checkpoints=None,
+            simplify=False,
+            fuse=False,
+            layout=None,
+            lowered=None,
+        ):
+        self.eliminated = 0
+        if simplify:
+            body, self.eliminated = passes.simplify(body)
+        if layout is not None:
+            body = passes.propagate_layout(body, layout)
+        if fuse:
+            body = passes.fuse(body)
+        if checkpoints is not None:
+            if backend == 'symbol':
+                raise ValueError('the symbol backend does not support checkpoints')
+            # 'sqrt' stores about sqrt(N) activations for N operations,
+            # an integer gives the number of operations per segment.
+            every = None if checkpoints == 'sqrt' else checkpoints
+            compile = lambda parameters, body: Function(parameters, body, backend, reuse_buffers)
+            body = checkpointing.segment(body, compile, every)
         self.parameters = parameters
         self.body = body
-        self.transform()
+        self.backend = backend
+        self.reuse_buffers = reuse_buffers
+        self.plan_memory = plan_memory
+        self.symbolic_leaves = []
+        for i, parameter in enumerate(parameters):
+            self.symbolic_leaves.extend(symbolic_leaves(i, parameter))
+        if backend == 'combinators':
+            if lowered is None:
+                self.transform()
+            else:
+                self.transformed = lowered
+        elif backend == 'tape':
+            self.transformed = \
+                tape.Program(
+                    self.parameters,
+                    self.body,
+                    reuse_buffers,
+                    plan_memory,
+                )
+        elif backend == 'symbol':
+            self.transformed = symbol.Program(self.parameters, self.body)
+        else:
+            raise ValueError('unknown backend %s' % backend)
 
     def __repr__(self):
         return "Function(%s, %s)" % (repr(self.parameters), repr(self.body))
 
     def __call__(self, *args):
-        return self.transformed(*args)
+        if not self.symbolic_leaves:
+            return self.transformed(*args)
+        with expr.bind(self.bind(args)):
+            return self.transformed(*args)
+
+    def infer(self, *args):
+        if not self.symbolic_leaves:
+            return self.transformed.infer(*args)
+        with expr.bind(self.bind(args)):
+            return self.transformed.infer(*args)
+
+    def save(self, path):
+        # The body is saved after every pass has run on it, so loading only
+        # needs options that pick and configure a backend.
+        options = {
+            'backend': self.backend,
+            'reuse_buffers': self.reuse_buffers,
+            'plan_memory': self.plan_memory,
+        }
+        lowered = self.transformed if self.backend == 'combinators' else None
+        with open(path, 'wb') as fd:
+            program.dump(fd, options, self.parameters, self.body, lowered)
+
+    def memory_plan(self, *args):
+        with expr.bind(self.bind(args)):
+            return planner.MemoryPlan(self.body, tape.float_dtype(args))
+
+    def bind(self, args):
+        values = {}
+        for index, path, shape in self.symbolic_leaves:
+            value = args[index]
+            for attr in path:
+                value = value[attr]
+            if len(value.shape) != len(shape):
+                raise expr.ShapeError('Expected %s, but got %s' % (shape, value.shape))
+            for x, n in zip(shape, value.shape):
+                if isinstance(x, expr.Dim):
+                    if values.setdefault(x, n) != n:
+                        raise expr.ShapeError('%s cannot be both %d and %d' % (x, values[x], n))
+                elif x != n:
+                    raise expr.ShapeError('Expected %s, but got %s' % (shape, value.shape))
+        return values
+
+    def copies(self, n):
+        if n == 1:
+            return combinators.Identity(1)
+        return \
+            combinators.Serial(
+                combinators.Duplicate(self.reuse_buffers),
+                combinators.Parallel(
+                    combinators.Identity(1),
+                    self.copies(n - 1),
+                ),
+            )
 
     def transform(self):
         exprs = expr.topological_sort(self.body)
         refs = expr.count_references(exprs)
 
-        scope = list(self.parameters)
+        # The scope is kept reversed, so that new values are appended, and
+        # positions counts from its far end, which don't change as values
+        # come and go near the front. Each step only rearranges the front
+        # of the scope up to its deepest argument.
+        stack = list(reversed(self.parameters))
+        positions = {}
+        for i, scope_e in enumerate(stack):
+            positions[scope_e] = i
         operations = []
 
-        mask = [refs[scope_e] == 0 for scope_e in scope]
+        def front(n):
+            return [stack[i] for i in range(len(stack) - 1, len(stack) - 1 - n, -1)]
+
+        def replace_front(n, values):
+            del stack[len(stack) - n:]
+            for value in reversed(values):
+                positions[value] = len(stack)
+                stack.append(value)
+
+        def beside(op, rest):
+            if rest == 0:
+                return op
+            return combinators.Parallel(op, combinators.Identity(rest))
+
+        mask = [refs[scope_e] == 0 for scope_e in self.parameters]
         if True in mask:
-            operations.append(
-                combinators.Discard(
-                    *[refs[scope_e] == 0 for scope_e in scope]
-                )
-            )
-            scope = [scope_e for scope_e in scope if refs[scope_e] != 0]
+            operations.append(combinators.Discard(*mask))
+            replace_front(len(stack), [scope_e for scope_e in self.parameters if refs[scope_e] != 0])
 
         for e in exprs:
-            if not isinstance(e, expr.Variable):
-                for child in e.children:
-                    refs[child] -= 1
-
-                if isinstance(e, expr.Apply):
-                    ops = []
-                    new_scope = []
-                    n = 0
-                    for scope_e in scope:
-                        new_scope.append(scope_e)
-                        if refs[scope_e] != 0 and scope_e in e.args:
-                            new_scope.append(scope_e)
-                            if n != 0:
-                                ops.append(combinators.Identity(n))
-                                n = 0
-                            ops.append(combinators.Duplicate())
-                        else:
-                            n += 1
-                    ops.append(combinators.Identity(n))
+            if isinstance(e, expr.Variable):
+                continue
+            for child in e.children:
+                refs[child] -= 1
+
+            if isinstance(e, expr.Apply):
+                n = 1 + max(len(stack) - 1 - positions[arg] for arg in e.args) if e.args else 0
+                rest = len(stack) - n
+                uses = collections.Counter(e.args)
+
+                ops = []
+                region = []
+                slots = collections.defaultdict(list)
+                identities = 0
+                for scope_e in front(n):
+                    # One copy per use as an argument, plus one to keep if
+                    # later expressions still need it.
+                    copies = uses[scope_e]
+                    if copies == 0:
+                        copies = 1
+                    elif refs[scope_e] != 0:
+                        copies += 1
+                    slots[scope_e].extend(range(len(region), len(region) + copies))
+                    region.extend([scope_e] * copies)
+                    if copies > 1:
+                        if identities != 0:
+                            ops.append(combinators.Identity(identities))
+                            identities = 0
+                        ops.append(self.copies(copies))
+                    else:
+                        identities += 1
+                if len(region) != n:
+                    ops.append(combinators.Identity(identities + rest))
+                    operations.append(combinators.Parallel(*ops))
+
+                indices = []
+                taken = set()
+                for arg in e.args:
+                    index = slots[arg].pop()
+                    indices.append(index)
+                    taken.add(index)
+                remaining = [scope_e for i, scope_e in enumerate(region) if not i in taken]
+                indices.extend(i for i in range(len(region)) if not i in taken)
+                if indices != list(range(len(region))):
                     operations.append(
-                        combinators.Parallel(*ops)
+                        beside(combinators.Permutation(*indices), rest)
                     )
-                    scope = new_scope
-
-                    indices = []
-                    new_scope = []
-                    for arg in e.args:
-                        indices.append(scope.index(arg))
-                        new_scope.append(arg)
-
-                    for i in range(len(scope)):
-                        if not i in indices:
-                            indices.append(i)
-                            new_scope.append(scope[i])
-
-                    if sorted(indices) != indices:
-                        scope = new_scope
-                        operations.append(
-                            combinators.Permutation(
-                                *indices
-                            )
-                        )
 
-                    n = len(scope) - len(e.args)
-                    if n == 0:
-                        operations.append(
-                            combinators.Apply(e.function, len(e.args))
-                        )
-                        scope = []
-                    else:
-                        operations.append(
-                            combinators.Parallel(
-                                combinators.Apply(e.function, len(e.args)),
-                                combinators.Identity(n),
-                            )
-                        )
-                        scope = scope[len(e.args):]
-                    scope = [e] + scope
-                elif isinstance(e, expr.Constant):
+                operations.append(
+                    beside(combinators.Apply(e.function, len(e.args)), len(remaining) + rest)
+                )
+                replace_front(n, [e] + remaining)
+            elif isinstance(e, expr.Constant):
+                operations.append(
+                    combinators.Parallel(
+                        combinators.Constant(e.value),
+                        combinators.Identity(len(stack)),
+                    )
+                )
+                replace_front(0, [e])
+            elif isinstance(e, expr.Index):
+                n = len(stack) - positions[e.value]
+                rest = len(stack) - n
+                region = front(n)
+                before = n - 1
+                if refs[e.value] != 0:
                     operations.append(
                         combinators.Parallel(
-                            combinators.Identity(len(scope)),
-                            combinators.Constant(e.value),
+                            combinators.Identity(before),
+                            combinators.Serial(
+                                combinators.Duplicate(self.reuse_buffers),
+                                combinators.Parallel(
+                                    combinators.Index(e.attr),
+                                    combinators.Identity(1),
+                                )
+                            ),
+                            combinators.Identity(rest),
                         )
                     )
-                    scope.append(e)
-                elif isinstance(e, expr.Index):
-                    n = scope.index(e.value)
-                    before = n
-                    after = len(scope) - before - 1
-                    if refs[e.value] != 0:
-                        operations.append(
-                            combinators.Parallel(
-                                combinators.Identity(before),
-                                combinators.Serial(
-                                    combinators.Duplicate(),
-                                    combinators.Parallel(
-                                        combinators.Index(e.attr),
-                                        combinators.Identity(1),
-                                    )
-                                ),
-                                combinators.Identity(after),
-                            )
-                        )
-                        scope = scope[:n] + [e] + scope[n:]
-                    else:
-                        operations.append(
-                            combinators.Parallel(
-                                combinators.Identity(before),
-                                combinators.Index(e.attr),
-                                combinators.Identity(after),
-                            )
-                        )
-                        scope = scope[:n] + [e] + scope[n+1:]
+                    replace_front(n, region[:-1] + [e, e.value])
                 else:
-                    raise NotImplementedError()
+                    operations.append(
+                        combinators.Parallel(
+                            combinators.Identity(before),
+                            combinators.Index(e.attr),
+                            combinators.Identity(rest),
+                        )
+                    )
+                    replace_front(n, region[:-1] + [e])
+            else:
+                raise NotImplementedError()
 
         self.transformed = combinators.Serial(*operations)
 
-def differentiable_function(f):
+def load_function(path):
+    with open(path, 'rb') as fd:
+        options = program.load_options(fd)
+        compile = lambda parameters, body: Function(parameters, body, options['backend'], options['reuse_buffers'])
+        parameters, body, lowered = program.load(fd, compile)
+    return Function(parameters, body, lowered=lowered, **options)
+
+def differentiable_function(f=None, **options):
+    if f is None:
+        return lambda f: differentiable_function(f, **options)
     signature = inspect.signature(f)
     symbolic_args = list(map(expr.Variable, signature.parameters))
     body = f(*symbolic_args)
     # We expect the output shape to be known
-    body.get_shape()
-    return Function(symbolic_args, body)
+    expr.infer_shapes(body)
+    return Function(symbolic_args, body, **options)
+
+def shape_signature(value):
+    if value is None:
+        return None
+    elif isinstance(value, collections.abc.Mapping):
+        return tuple(sorted((key, shape_signature(v)) for key, v in value.items()))
+    else:
+        return (tuple(value.shape), getattr(value, 'dtype', None))
+
+def fix_shapes(variable, value):
+    if value is None:
+        return
+    elif isinstance(value, collections.abc.Mapping):
+        for key, v in value.items():
+            fix_shapes(variable[key], v)
+    else:
+        variable.assert_shape(tuple(value.shape))
+
+class FunctionCache:
+    def __init__(self, f, maxsize=16, **options):
+        self.f = f
+        self.maxsize = maxsize
+        self.options = options
+        self.functions = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "FunctionCache(%s, hits=%d, misses=%d, size=%d)" % (self.f.__name__, self.hits, self.misses, len(self.functions))
+
+    def trace(self, *args):
+        key = tuple(map(shape_signature, args))
+        function = self.functions.get(key)
+        if function is not None:
+            self.hits += 1
+            self.functions.move_to_end(key)
+            return function
+
+        self.misses += 1
+        signature = inspect.signature(self.f)
+        symbolic_args = list(map(expr.Variable, signature.parameters))
+        for symbolic_arg, arg in zip(symbolic_args, args):
+            fix_shapes(symbolic_arg, arg)
+        body = self.f(*symbolic_args)
+        expr.infer_shapes(body)
+        function = Function(symbolic_args, body, **self.options)
+
+        self.functions[key] = function
+        if self.maxsize is not None and len(self.functions) > self.maxsize:
+            self.functions.popitem(last=False)
+        return function
+
+    def __call__(self, *args):
+        return self.trace(*args)(*args)
+
+    def infer(self, *args):
+        return self.trace(*args).infer(*args)
+
+    def clear(self):
+        self.functions.clear()
+        self.hits = 0
+        self.misses = 0
+
+def cached_function(f=None, maxsize=16, **options):
+    if f is None:
+        return lambda f: cached_function(f, maxsize, **options)
+    return FunctionCache(f, maxsize, **options)
@@ -0,0 +1,134 @@
+from cognite import data
+import collections.abc
+import math
+from cognite.lazy import mx
+
+def pairs(parameters, gradients, path=()):
+    if gradients is data.zero:
+        return
+    if isinstance(parameters, collections.abc.Mapping):
+        for key, value in parameters.items():
+            if key in gradients:
+                yield from pairs(value, gradients[key], path + (key,))
+    else:
+        if parameters.shape != gradients.shape:
+            raise ValueError('gradient for %s has shape %s, expected %s' % (repr(path), gradients.shape, parameters.shape))
+        yield path, parameters, gradients
+
+class Optimizer:
+    def __init__(self):
+        self.state = {}
+        self.steps = 0
+
+    def create_state(self, weight):
+        return None
+
+    def update_leaf(self, weight, gradient, state):
+        raise NotImplementedError("not implemented for %s" % repr(type(self)))
+
+    def update(self, parameters, gradients):
+        self.steps += 1
+        for path, weight, gradient in pairs(parameters, gradients):
+            key = (path, weight.shape)
+            if not key in self.state:
+                self.state[key] = self.create_state(weight)
+            self.update_leaf(weight, gradient, self.state[key])
+
+class SGD(Optimizer):
+    def __init__(self, learning_rate=0.01, momentum=0.0, weight_decay=0.0):
+        super().__init__()
+        self.learning_rate = learning_rate
+        self.momentum = momentum
+        self.weight_decay = weight_decay
+
+    def create_state(self, weight):
+        if self.momentum == 0.0:
+            return None
+        return mx.ndarray.zeros(weight.shape, ctx=weight.context, dtype=weight.dtype)
+
+    def update_leaf(self, weight, gradient, momentum):
+        if momentum is None:
+            mx.ndarray.sgd_update(
+                weight,
+                gradient,
+                lr = self.learning_rate,
+                wd = self.weight_decay,
+                out = weight,
+            )
+        else:
+            mx.ndarray.sgd_mom_update(
+                weight,
+                gradient,
+                momentum,
+                lr = self.learning_rate,
+                momentum = self.momentum,
+                wd = self.weight_decay,
+                out = weight,
+            )
+
+    def __repr__(self):
+        return "SGD(%g, %g)" % (self.learning_rate, self.momentum)
+
+class Adam(Optimizer):
+    def __init__(self, learning_rate=0.001, beta1=0.9, beta2=0.999, epsilon=1e-8, weight_decay=0.0):
+        super().__init__()
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.weight_decay = weight_decay
+
+    def create_state(self, weight):
+        mean = mx.ndarray.zeros(weight.shape, ctx=weight.context, dtype=weight.dtype)
+        variance = mx.ndarray.zeros(weight.shape, ctx=weight.context, dtype=weight.dtype)
+        return (mean, variance)
+
+    def update(self, parameters, gradients):
+        t = self.steps + 1
+        correction = math.sqrt(1 - self.beta2**t) / (1 - self.beta1**t)
+        self.corrected_learning_rate = self.learning_rate * correction
+        super().update(parameters, gradients)
+
+    def update_leaf(self, weight, gradient, state):
+        mean, variance = state
+        mx.ndarray.adam_update(
+            weight,
+            gradient,
+            mean,
+            variance,
+            lr = self.corrected_learning_rate,
+            beta1 = self.beta1,
+            beta2 = self.beta2,
+            epsilon = self.epsilon,
+            wd = self.weight_decay,
+            out = weight,
+        )
+
+    def __repr__(self):
+        return "Adam(%g)" % self.learning_rate
+
+class RMSProp(Optimizer):
+    def __init__(self, learning_rate=0.001, gamma=0.9, epsilon=1e-8, weight_decay=0.0):
+        super().__init__()
+        self.learning_rate = learning_rate
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.weight_decay = weight_decay
+
+    def create_state(self, weight):
+        return mx.ndarray.zeros(weight.shape, ctx=weight.context, dtype=weight.dtype)
+
+    def update_leaf(self, weight, gradient, n):
+        mx.ndarray.rmsprop_update(
+            weight,
+            gradient,
+            n,
+            lr = self.learning_rate,
+            gamma1 = self.gamma,
+            epsilon = self.epsilon,
+            wd = self.weight_decay,
+            out = weight,
+        )
+
+    def __repr__(self):
+        return "RMSProp(%g)" % self.learning_rate
@@ -0,0 +1,265 @@
+from cognite import data
+from cognite import expr
+from cognite.add import Add
+from cognite.add_biases import AddBiases
+from cognite.broadcast import Broadcast
+from cognite.convolution import Convolution, check_layout
+from cognite.divide import Divide
+from cognite.relu import Relu
+from cognite.reshape import Reshape
+from cognite.sigmoid import Sigmoid
+from cognite.sqrt import Sqrt
+from cognite.squared_difference import SquaredDifference
+from cognite.subtract import Subtract
+from cognite.transpose import Transpose
+from cognite.upsample import Upsample
+
+def function_key(function):
+    # Op instances that hold the same parameters compute the same thing,
+    # those that hold unhashable state are only equal to themselves.
+    key = (type(function), tuple(sorted(vars(function).items())))
+    try:
+        hash(key)
+    except TypeError:
+        return function
+    return key
+
+def known_shape(e):
+    try:
+        return tuple(e.get_shape())
+    except expr.ShapeError:
+        return None
+
+def is_noop(function, arg):
+    if isinstance(function, Reshape):
+        return known_shape(arg) == tuple(function.shape)
+    elif isinstance(function, Broadcast):
+        return function.shape is not None and known_shape(arg) == tuple(function.shape)
+    return False
+
+def rebuild(e, args, nodes):
+    function = e.function
+    if len(args) == 1 and is_noop(function, args[0]):
+        return args[0]
+    if isinstance(function, Reshape) and isinstance(args[0], expr.Apply) and isinstance(args[0].function, Reshape):
+        args = args[0].args
+        if is_noop(function, args[0]):
+            return args[0]
+    if args and all(isinstance(arg, expr.Constant) for arg in args):
+        return expr.Constant(function.infer([arg.value for arg in args]))
+
+    key = (function_key(function), tuple(args))
+    node = nodes.get(key)
+    if node is None:
+        if all(new is old for new, old in zip(args, e.args)) and len(args) == len(e.args):
+            node = e
+        else:
+            node = expr.Apply(function, list(args))
+        nodes[key] = node
+    return node
+
+def simplify(body):
+    exprs = expr.topological_sort(body)
+    mapping = {}
+    nodes = {}
+    for e in exprs:
+        if isinstance(e, expr.Apply):
+            mapping[e] = rebuild(e, [mapping[arg] for arg in e.args], nodes)
+        else:
+            mapping[e] = e
+    simplified = mapping[body]
+    eliminated = len(exprs) - len(expr.topological_sort(simplified))
+    return simplified, eliminated
+
+elementwise = (Add, AddBiases, Divide, Relu, Sigmoid, Sqrt, SquaredDifference, Subtract)
+
+class Fused(expr.Function):
+    supports_out = True
+
+    def __init__(self, steps, shape):
+        # Each step is a function and, for each of its arguments, either
+        # the index of an input or None for the previous step's output.
+        self.steps = steps
+        self.shape = shape
+
+    def step_args(self, indices, args, value):
+        return [value if i is None else args[i] for i in indices]
+
+    def infer(self, args, out=None):
+        value = None
+        for function, indices in self.steps:
+            value = function.infer(self.step_args(indices, args, value), out=out)
+            out = value
+        return value
+
+    # Only inference writes the chain into one buffer. Training runs each
+    # step's own forward, so it keeps what each step's backward needs and
+    # costs the same as the unfused graph.
+    def forward(self, args):
+        value = None
+        backwards = []
+        for function, indices in self.steps:
+            value, step_backward = function.forward(self.step_args(indices, args, value))
+            backwards.append((indices, step_backward))
+        def backward(gradient):
+            gradients = [data.zero] * len(args)
+            for indices, step_backward in reversed(backwards):
+                if gradient is data.zero:
+                    break
+                step_gradients = step_backward(gradient)
+                gradient = data.zero
+                for i, step_gradient in zip(indices, step_gradients):
+                    if i is None:
+                        gradient = step_gradient
+                    else:
+                        gradients[i] = data.add(gradients[i], step_gradient)
+            return tuple(gradients)
+        return value, backward
+
+    def symbol(self, args):
+        value = None
+        for function, indices in self.steps:
+            value = function.symbol(self.step_args(indices, args, value))
+        return value
+
+    def get_output_shape(self, args):
+        return self.shape
+
+    def __repr__(self):
+        return "Fused(%s)" % ', '.join(type(function).__name__ for function, indices in self.steps)
+
+def is_elementwise(e):
+    return isinstance(e, expr.Apply) and isinstance(e.function, elementwise)
+
+def fuse(body):
+    exprs = expr.topological_sort(body)
+    refs = expr.count_references(exprs)
+
+    # Chains grow downwards from their last operation through arguments
+    # that nothing else uses and that have the same shape, so every step
+    # can write into the same buffer.
+    absorbed = set()
+    chains = {}
+    for e in reversed(exprs):
+        if not is_elementwise(e) or e in absorbed:
+            continue
+        chain = [e]
+        while True:
+            head = chain[-1]
+            candidates = [
+                arg
+                for arg in head.args
+                if is_elementwise(arg) and refs[arg] == 1 and
+                    known_shape(arg) is not None and known_shape(arg) == known_shape(head)
+            ]
+            if not candidates:
+                break
+            absorbed.add(candidates[0])
+            chain.append(candidates[0])
+        if len(chain) > 1:
+            chains[e] = chain[::-1]
+
+    mapping = {}
+    for e in exprs:
+        if e in absorbed:
+            continue
+        elif e in chains:
+            chain = chains[e]
+            inputs = []
+            positions = {}
+            steps = []
+            for i, step in enumerate(chain):
+                indices = []
+                for arg in step.args:
+                    if i > 0 and arg is chain[i-1]:
+                        indices.append(None)
+                    else:
+                        arg = mapping[arg]
+                        if not arg in positions:
+                            positions[arg] = len(inputs)
+                            inputs.append(arg)
+                        indices.append(positions[arg])
+                steps.append((step.function, indices))
+            mapping[e] = expr.Apply(Fused(steps, known_shape(e)), inputs)
+        elif isinstance(e, expr.Apply):
+            mapping[e] = reapply(e, [mapping[arg] for arg in e.args])
+        else:
+            mapping[e] = e
+    return mapping[body]
+
+def reapply(e, args):
+    if all(new is old for new, old in zip(args, e.args)):
+        return e
+    return expr.Apply(e.function, args)
+
+def permutation(source, target):
+    return tuple(source.index(axis) for axis in target)
+
+def compose(inner, outer):
+    if inner is None:
+        axes = outer
+    elif outer is None:
+        axes = inner
+    else:
+        axes = tuple(inner[i] for i in outer)
+    if axes is None or axes == tuple(range(len(axes))):
+        return None
+    return axes
+
+def propagate_layout(body, layout='NCHW'):
+    check_layout(layout)
+    exprs = expr.topological_sort(body)
+
+    # Every expression is represented by a node and the axes to transpose
+    # that node by, so that transposes are only materialized where an
+    # operation depends on the layout of its arguments.
+    views = {}
+    transposes = {}
+    def materialize(e, axes=None):
+        node, inner = views[e]
+        axes = compose(inner, axes)
+        if axes is None:
+            return node
+        if not (node, axes) in transposes:
+            transposes[(node, axes)] = expr.Apply(Transpose(axes), [node])
+        return transposes[(node, axes)]
+
+    for e in exprs:
+        if not isinstance(e, expr.Apply):
+            views[e] = (e, None)
+            continue
+
+        function = e.function
+        arg_views = [views[arg] for arg in e.args]
+        axes = arg_views[0][1] if arg_views else None
+        if isinstance(function, Transpose):
+            node, inner = arg_views[0]
+            views[e] = (node, compose(inner, function.axes))
+        elif isinstance(function, (Convolution, Upsample)) and function.layout != layout:
+            if isinstance(function, Convolution):
+                converted = \
+                    Convolution(
+                        function.kernel,
+                        function.outputs,
+                        layout,
+                        function.stride,
+                        function.pad,
+                        function.dilate,
+                    )
+            else:
+                converted = Upsample(function.scale, layout)
+            args = [materialize(e.args[0], permutation(function.layout, layout))]
+            args.extend(materialize(arg) for arg in e.args[1:])
+            views[e] = (expr.Apply(converted, args), permutation(layout, function.layout))
+        elif axes is not None and isinstance(function, (Relu, Sigmoid, Sqrt)):
+            views[e] = (expr.Apply(function, [arg_views[0][0]]), axes)
+        elif axes is not None and isinstance(function, (Add, Divide, SquaredDifference, Subtract)) and \
+                all(other == axes for node, other in arg_views):
+            views[e] = (expr.Apply(function, [node for node, other in arg_views]), axes)
+        elif axes is not None and isinstance(function, AddBiases):
+            axis = axes[len(axes) + function.axis] - len(axes)
+            args = [arg_views[0][0], materialize(e.args[1])]
+            views[e] = (expr.Apply(AddBiases(axis), args), axes)
+        else:
+            views[e] = (reapply(e, [materialize(arg) for arg in e.args]), None)
+    return materialize(body)
@@ -0,0 +1,194 @@
+import collections
+import concurrent.futures
+import contextlib
+from cognite.lazy import mx
+from cognite.lazy import np
+import queue
+import threading
+
+class Failure:
+    def __init__(self, exception):
+        self.exception = exception
+
+class Prefetcher:
+    def __init__(self, source, depth=2):
+        assert depth >= 1
+        self.source = source
+        self.depth = depth
+
+    def produce(self, output, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    output.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        # Closing the source when the consumer stops early lets a generator
+        # release what it holds, such as a pool of workers.
+        source = iter(self.source)
+        with contextlib.closing(source) if hasattr(source, 'close') else contextlib.nullcontext():
+            try:
+                for item in source:
+                    if not put(item):
+                        return
+            except Exception as e:
+                put(Failure(e))
+            else:
+                put(StopIteration)
+
+    def __iter__(self):
+        output = queue.Queue(self.depth)
+        stop = threading.Event()
+        thread = threading.Thread(target=self.produce, args=(output, stop), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = output.get()
+                if item is StopIteration:
+                    return
+                if isinstance(item, Failure):
+                    raise item.exception
+                yield item
+        finally:
+            stop.set()
+
+def bounded_map(executor, fn, iterable, limit):
+    pending = collections.deque()
+    for x in iterable:
+        pending.append(executor.submit(fn, x))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def as_fields(sample):
+    if isinstance(sample, (tuple, list)):
+        return tuple(sample)
+    return (sample,)
+
+# A single dtype converts floating point fields and leaves others, such as
+# integer labels, as they are. A sequence gives one dtype per field, where
+# None keeps the field's own.
+def field_dtypes(fields, dtype):
+    if isinstance(dtype, (tuple, list)):
+        assert len(dtype) == len(fields)
+        dtypes = dtype
+    else:
+        dtypes = [
+            dtype if np.issubdtype(np.asarray(field).dtype, np.floating) else None
+            for field in fields
+        ]
+    return [
+        np.asarray(field).dtype if dtype is None else np.dtype(dtype)
+        for field, dtype in zip(fields, dtypes)
+    ]
+
+class Collator:
+    def __init__(self, batch_size, slots, ctx=None, dtype='float32'):
+        self.batch_size = batch_size
+        self.slots = slots
+        self.ctx = ctx
+        self.dtype = dtype
+        self.dtypes = None
+        self.staging = None
+        self.outputs = None
+        self.next_slot = 0
+
+    def allocate(self, fields):
+        self.staging = []
+        self.outputs = []
+        for field, dtype in zip(fields, self.dtypes):
+            shape = (self.batch_size,) + np.shape(field)
+            self.staging.append(np.empty(shape, dtype=dtype))
+        for i in range(self.slots):
+            self.outputs.append([
+                mx.ndarray.empty(staging.shape, ctx=self.ctx or mx.cpu(), dtype=staging.dtype)
+                for staging in self.staging
+            ])
+
+    def __call__(self, samples):
+        samples = [as_fields(sample) for sample in samples]
+        if self.dtypes is None:
+            self.dtypes = field_dtypes(samples[0], self.dtype)
+        if len(samples) != self.batch_size:
+            return tuple(
+                mx.ndarray.array(np.stack(field), ctx=self.ctx or mx.cpu(), dtype=dtype)
+                for field, dtype in zip(zip(*samples), self.dtypes)
+            )
+
+        if self.staging is None:
+            self.allocate(samples[0])
+        for i, sample in enumerate(samples):
+            for staging, field in zip(self.staging, sample):
+                staging[i] = field
+
+        outputs = self.outputs[self.next_slot]
+        self.next_slot = (self.next_slot + 1) % self.slots
+        for output, staging in zip(outputs, self.staging):
+            output[:] = staging
+        return tuple(outputs)
+
+def batches(samples, batch_size, drop_last=True):
+    batch = []
+    for sample in samples:
+        batch.append(sample)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch and not drop_last:
+        yield batch
+
+class Pipeline:
+    def __init__(
+            self,
+            samples,
+            batch_size,
+            transform=None,
+            workers=0,
+            processes=False,
+            depth=2,
+            ctx=None,
+            dtype='float32',
+            drop_last=True,
+        ):
+        self.samples = samples
+        self.batch_size = batch_size
+        self.transform = transform
+        self.workers = workers
+        self.processes = processes
+        self.depth = depth
+        self.ctx = ctx
+        self.dtype = dtype
+        self.drop_last = drop_last
+
+    def produce(self):
+        samples = self.samples
+        if callable(samples):
+            samples = samples()
+
+        executor = None
+        try:
+            if self.transform is not None and self.workers > 0:
+                if self.processes:
+                    executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+                else:
+                    executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+                limit = self.workers * 2 + self.batch_size
+                samples = bounded_map(executor, self.transform, samples, limit)
+            elif self.transform is not None:
+                samples = map(self.transform, samples)
+
+            # A collated batch stays valid while depth + 1 further batches
+            # are prepared: depth in the queue and one being written.
+            collate = Collator(self.batch_size, self.depth + 2, self.ctx, self.dtype)
+            for batch in batches(samples, self.batch_size, self.drop_last):
+                yield collate(batch)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def __iter__(self):
+        return iter(Prefetcher(self.produce(), self.depth))
@@ -0,0 +1,113 @@
+from cognite import expr
+import collections
+import functools
+from cognite.lazy import mx
+from cognite.lazy import np
+import operator
+
+def num_bytes(shape, itemsize=4):
+    return itemsize * functools.reduce(operator.mul, shape, 1)
+
+class MemoryPlan:
+    def __init__(self, body, dtype='float32'):
+        exprs = expr.topological_sort(body)
+        refs = expr.count_references(exprs)
+        self.dtype = dtype
+        self.itemsize = itemsize = np.dtype(dtype).itemsize
+
+        # Views share their input's memory, so only the other
+        # intermediates are counted.
+        self.shapes = {}
+        for e in exprs:
+            if isinstance(e, expr.Apply) and not e.function.aliases_input:
+                self.shapes[e] = expr.resolve(tuple(e.get_shape()))
+
+        deaths = {}
+        for i, e in enumerate(exprs):
+            for child in e.children:
+                refs[child] -= 1
+                if refs[child] == 0:
+                    deaths[child] = i
+
+        # A view keeps the buffer it aliases alive for as long as it
+        # lives itself, and anything the output aliases must outlive the
+        # call.
+        escapes = set([body])
+        for e in reversed(exprs):
+            if isinstance(e, expr.Apply) and e.function.aliases_input:
+                for arg in e.args:
+                    if e in escapes:
+                        escapes.add(arg)
+                    elif arg in deaths:
+                        deaths[arg] = max(deaths[arg], deaths[e])
+
+        planned = set()
+        for e in self.shapes:
+            if e.function.supports_out and not e in escapes:
+                planned.add(e)
+
+        releases = collections.defaultdict(list)
+        for e, step in deaths.items():
+            releases[step].append(e)
+
+        self.sizes = []
+        self.assignments = {}
+        free = []
+        live = 0
+        self.live_bytes = 0
+        for i, e in enumerate(exprs):
+            if e in self.shapes:
+                live += num_bytes(self.shapes[e], itemsize)
+                self.live_bytes = max(self.live_bytes, live)
+            if e in planned:
+                size = num_bytes(self.shapes[e], itemsize)
+                candidates = [b for b in free if self.sizes[b] >= size]
+                if candidates:
+                    b = min(candidates, key=self.sizes.__getitem__)
+                    free.remove(b)
+                elif free:
+                    b = max(free, key=self.sizes.__getitem__)
+                    free.remove(b)
+                    self.sizes[b] = size
+                else:
+                    b = len(self.sizes)
+                    self.sizes.append(size)
+                self.assignments[e] = b
+            for dead in releases[i]:
+                if dead in self.shapes:
+                    live -= num_bytes(self.shapes[dead], itemsize)
+                if dead in self.assignments:
+                    free.append(self.assignments[dead])
+
+        self.naive_bytes = sum(num_bytes(shape, itemsize) for shape in self.shapes.values())
+        unplanned_bytes = \
+            sum(
+                num_bytes(shape, itemsize)
+                for e, shape in self.shapes.items()
+                if not e in self.assignments
+            )
+        self.planned_bytes = sum(self.sizes) + unplanned_bytes
+
+    def allocate(self, ctx=None):
+        buffers = [
+            mx.ndarray.empty((size // self.itemsize,), ctx=ctx or mx.cpu(), dtype=self.dtype)
+            for size in self.sizes
+        ]
+        views = {}
+        for e, b in self.assignments.items():
+            shape = self.shapes[e]
+            n = num_bytes(shape, 1)
+            views[e] = buffers[b][:n].reshape(shape)
+        return views
+
+    def report(self):
+        return \
+            'naive %.2f MB, live peak %.2f MB, planned %.2f MB in %d buffers' % (
+                self.naive_bytes / 2**20,
+                self.live_bytes / 2**20,
+                self.planned_bytes / 2**20,
+                len(self.sizes),
+            )
+
+    def __repr__(self):
+        return "MemoryPlan(%s)" % self.report()
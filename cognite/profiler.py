@@ -0,0 +1,133 @@
+import collections
+import json
+from cognite.lazy import mx
+from cognite.lazy import np
+import time
+
+# The profiler collecting timings, if any. Checked on every application, so
+# it is a plain module attribute rather than anything more elaborate.
+current = None
+
+def num_bytes(value):
+    if not isinstance(value, mx.ndarray.NDArray):
+        return 0
+    return value.size * np.dtype(value.dtype).itemsize
+
+class Record:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.times = collections.Counter()
+        self.output_bytes = 0
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+class Profiler:
+    def __init__(self, synchronize=False, max_events=100000):
+        self.synchronize = synchronize
+        self.records = collections.OrderedDict()
+        self.counts = collections.Counter()
+        # The records add up every call, but the trace keeps only the
+        # latest events, so that long runs don't grow without bound.
+        self.events = collections.deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self.previous = None
+
+    def __enter__(self):
+        global current
+        self.previous = current
+        current = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global current
+        current = self.previous
+
+    def now(self):
+        # MXNet runs asynchronously, so without waiting the time is only
+        # that of queueing the operation.
+        if self.synchronize:
+            mx.ndarray.waitall()
+        return time.perf_counter()
+
+    def record(self, key, function, phase, start, end):
+        record = self.records.get(key)
+        if record is None:
+            name = type(function).__name__
+            record = Record('%s#%d' % (name, self.counts[name]))
+            self.counts[name] += 1
+            self.records[key] = record
+        record.times[phase] += end - start
+        self.events.append((record.name, phase, start, end))
+        return record
+
+    def forward(self, key, function, args):
+        start = self.now()
+        output, backward = function.forward(args)
+        end = self.now()
+        record = self.record(key, function, 'forward', start, end)
+        record.calls += 1
+        record.output_bytes += num_bytes(output)
+        def profiled_backward(gradient):
+            start = self.now()
+            gradients = backward(gradient)
+            self.record(key, function, 'backward', start, self.now())
+            return gradients
+        return output, profiled_backward
+
+    def infer(self, key, function, args, out=None):
+        start = self.now()
+        if out is None:
+            output = function.infer(args)
+        else:
+            output = function.infer(args, out=out)
+        record = self.record(key, function, 'infer', start, self.now())
+        record.calls += 1
+        record.output_bytes += num_bytes(output)
+        return output
+
+    def report(self):
+        lines = [
+            '%-32s %8s %12s %12s %12s %12s %10s' % (
+                'op', 'calls', 'forward ms', 'backward ms', 'infer ms', 'total ms', 'output MB',
+            )
+        ]
+        for record in sorted(self.records.values(), key=lambda record: record.total, reverse=True):
+            lines.append(
+                '%-32s %8d %12.3f %12.3f %12.3f %12.3f %10.2f' % (
+                    record.name,
+                    record.calls,
+                    record.times['forward'] * 1000,
+                    record.times['backward'] * 1000,
+                    record.times['infer'] * 1000,
+                    record.total * 1000,
+                    record.output_bytes / 2**20,
+                )
+            )
+        return '\n'.join(lines)
+
+    def trace(self):
+        return {
+            'traceEvents': [
+                {
+                    'name': name,
+                    'cat': phase,
+                    'ph': 'X',
+                    'ts': (start - self.origin) * 1e6,
+                    'dur': (end - start) * 1e6,
+                    'pid': 0,
+                    'tid': 0,
+                }
+                for name, phase, start, end in self.events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def dump_trace(self, path):
+        with open(path, 'w') as fd:
+            json.dump(self.trace(), fd)
+
+    def __repr__(self):
+        return "Profiler(%d ops, %d events)" % (len(self.records), len(self.events))
@@ -0,0 +1,131 @@
+from cognite import checkpoint as checkpointing
+from cognite import combinators
+from cognite import data
+from cognite import expr
+import gc
+import pickle
+
+version = 1
+
+# Graphs are written as a flat table of nodes in topological order, each
+# referring to earlier ones by index, so that deep graphs don't hit the
+# recursion limit. Ops and combinators are pickled as they are, which
+# keeps their hyperparameters and shares them between the graph and the
+# lowered program.
+def encode(parameters, body):
+    refs = {}
+    nodes = []
+
+    def add(e, node):
+        refs[e] = len(nodes)
+        nodes.append(node)
+
+    def add_tree(e):
+        if isinstance(e, expr.Variable):
+            add(e, ('variable', e.name, e.shape))
+        else:
+            add(e, ('index', refs[e.value], e.attr, e.shape))
+        for descendent in e.descendents.values():
+            add_tree(descendent)
+
+    for parameter in parameters:
+        add_tree(parameter)
+    for e in expr.topological_sort(body):
+        if e in refs:
+            continue
+        if isinstance(e, expr.Apply):
+            add(e, ('apply', e.function, [refs[arg] for arg in e.args], e.shape))
+        elif isinstance(e, expr.Constant):
+            add(e, ('constant', e.value))
+        elif isinstance(e, (expr.Variable, expr.Index)):
+            add_tree(e)
+        else:
+            raise TypeError('cannot save %s' % repr(type(e)))
+    return nodes, [refs[parameter] for parameter in parameters], refs[body]
+
+def decode(graph):
+    nodes, parameters, body = graph
+    exprs = []
+    for node in nodes:
+        kind = node[0]
+        if kind == 'variable':
+            e = expr.Variable(node[1])
+            e.shape = node[2]
+        elif kind == 'index':
+            e = exprs[node[1]][node[2]]
+            e.shape = node[3]
+        elif kind == 'constant':
+            e = expr.Constant(node[1])
+        elif kind == 'apply':
+            e = expr.Apply(node[1], [exprs[i] for i in node[2]])
+            e.shape = node[3]
+        else:
+            raise pickle.UnpicklingError('unknown node %s' % repr(kind))
+        exprs.append(e)
+    return [exprs[i] for i in parameters], exprs[body]
+
+def load_checkpoint(graph):
+    raise pickle.UnpicklingError('checkpoints can only be loaded with program.load')
+
+class Pickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        # A checkpoint's compiler closes over the options of the function
+        # it belongs to, so its segment is saved as a graph instead.
+        if isinstance(obj, checkpointing.Checkpoint):
+            return load_checkpoint, (encode(obj.parameters, obj.body),)
+        # Accumulated buffers are scratch space, not part of the program.
+        if isinstance(obj, data.Accumulator):
+            return data.Accumulator, ()
+        return NotImplemented
+
+allowed_types = (expr.Function, expr.Dim, combinators.Combinator, data.Accumulator)
+allowed_globals = {
+    ('builtins', 'bytearray'),
+    ('mxnet.ndarray.ndarray', 'NDArray'),
+    ('cognite.data', 'add'),
+}
+
+class Unpickler(pickle.Unpickler):
+    def __init__(self, fd, compile=None):
+        super().__init__(fd)
+        self.compile = compile
+
+    def load_checkpoint(self, graph):
+        parameters, body = decode(graph)
+        return checkpointing.Checkpoint(parameters, body, self.compile)
+
+    def find_class(self, module, name):
+        # Only ops and combinators are loaded, never the code that built
+        # the model or anything else a file could name.
+        if (module, name) == (__name__, 'load_checkpoint'):
+            return self.load_checkpoint
+        if (module, name) in allowed_globals:
+            return super().find_class(module, name)
+        if module.startswith('cognite.'):
+            value = super().find_class(module, name)
+            if isinstance(value, type) and issubclass(value, allowed_types):
+                return value
+        raise pickle.UnpicklingError('%s.%s cannot be part of a saved program' % (module, name))
+
+def dump(fd, options, parameters, body, lowered=None):
+    pickle.dump({'version': version, 'options': options}, fd, protocol=4)
+    Pickler(fd, protocol=4).dump((encode(parameters, body), lowered))
+
+def load_options(fd):
+    header = Unpickler(fd).load()
+    if header.get('version') != version:
+        raise ValueError('expected a program of version %d, but got %s' % (version, header.get('version')))
+    return header['options']
+
+def load(fd, compile):
+    # Unpickling creates many small objects and no garbage, so collections
+    # triggered along the way are pure overhead, several times the load.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        graph, lowered = Unpickler(fd, compile).load()
+    finally:
+        if enabled:
+            gc.enable()
+    parameters, body = decode(graph)
+    return parameters, body, lowered
@@ -1,7 +1,9 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Relu(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         assert len(args) == 1
         x = args[0]
@@ -12,6 +14,14 @@ class Relu(expr.Function):
             return (mx.ndarray.multiply(gradient, mask),)
         return output, backward
 
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        return mx.ndarray.relu(args[0], out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.relu(args[0])
+
     def assert_output_shape(self, args, shape):
         assert len(args) == 1
         x = args[0]
@@ -1,12 +1,9 @@
 from cognite import expr
-import functools
-import mxnet as mx
-import operator
-
-def num_values(shape):
-    return functools.reduce(operator.mul, shape, 1)
+from cognite.lazy import mx
 
 class Reshape(expr.Function):
+    aliases_input = True
+
     def __init__(self, shape):
         self.shape = shape
 
@@ -14,22 +11,32 @@ class Reshape(expr.Function):
         assert len(args) == 1
         values = args[0]
 
-        output = mx.ndarray.reshape(values, self.shape)
+        shape = expr.resolve(self.shape)
+        output = mx.ndarray.reshape(values, shape)
         def backwards(gradients):
-            assert gradients.shape == self.shape, "gradients wrong shape %s instead of %s" % (repr(gradients.shape), repr(self.shape))
+            assert gradients.shape == shape, "gradients wrong shape %s instead of %s" % (repr(gradients.shape), repr(shape))
             return (mx.ndarray.reshape(gradients, values.shape),)
         return output, backwards
 
+    def infer(self, args, out=None):
+        assert out is None
+        assert len(args) == 1
+        return mx.ndarray.reshape(args[0], expr.resolve(self.shape))
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.reshape(args[0], shape=expr.resolve(self.shape))
+
     def get_output_shape(self, args):
         assert len(args) == 1
         values = args[0]
         input_shape = values.get_shape()
-        if num_values(self.shape) != num_values(input_shape):
-            raise expr.ShapeError('Incompatible shapes for reshaping %s and %s' % (input_shape, shape))
-        return self.shape
+        if expr.num_values(self.shape) != expr.num_values(input_shape):
+            raise expr.ShapeError('Incompatible shapes for reshaping %s and %s' % (input_shape, self.shape))
+        return tuple(self.shape)
 
 def reshape(values, new_shape):
     if isinstance(values, expr.Constant):
-        return expr.Constant(Reshape(new_shape).forward([values.value]))
+        return expr.Constant(Reshape(new_shape).forward([values.value])[0])
     else:
         return expr.Apply(Reshape(new_shape), [values])
@@ -1,16 +1,26 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Sigmoid(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         assert len(args) == 1
         x = args[0]
 
         s = mx.ndarray.sigmoid(x)
         def backward(gradient):
-            return (s*(1-s),)
+            return (mx.ndarray.multiply(gradient, s*(1-s)),)
         return s, backward
 
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        return mx.ndarray.sigmoid(args[0], out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.sigmoid(args[0])
+
     def assert_output_shape(self, args, shape):
         assert len(args) == 1
         x = args[0]
@@ -1,26 +1,34 @@
+from cognite import data
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class SigmoidCrossEntropy(expr.Function):
+    supports_out = True
+    nondifferentiable_args = (1,)
+
     def forward(self, args):
         x, labels = args
         assert(x.shape == labels.shape)
 
+        t = mx.ndarray.sigmoid(x)
         def backward(gradients):
-            t = mx.ndarray.sigmoid(x)
-            x_gradient = mx.ndarray.multiply(gradients, mx.ndarray.subtract(t, labels))
+            x_gradient = mx.ndarray.subtract(t, labels)
+            x_gradient *= gradients
+            return (x_gradient, data.zero)
 
-            # FIXME:
-            label_gradient = mx.ndarray.zeros(labels.shape)
-            return (x_gradient, label_gradient)
+        return t, backward
 
-        output = \
-            mx.ndarray.LogisticRegressionOutput(
-                data=x,
-                labels=labels,
-            )
+    def infer(self, args, out=None):
+        x, labels = args
+        return mx.ndarray.sigmoid(x, out=out)
 
-        return output, backward
+    def symbol(self, args):
+        x, labels = args
+        t = mx.symbol.sigmoid(x)
+        # The output is sigmoid(x), but the gradient with respect to x is
+        # that of the cross-entropy, as with LogisticRegressionOutput.
+        z = x * mx.symbol.BlockGrad(t - labels)
+        return mx.symbol.BlockGrad(t) + (z - mx.symbol.BlockGrad(z))
 
     def assert_output_shape(self, args, shape):
         a, b = args
@@ -1,16 +1,27 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Softmax(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         assert len(args) == 1
         x = args[0]
 
         output = mx.ndarray.softmax(x)
         def backward(gradients):
-            raise NotImplementedError()
+            dot = mx.ndarray.sum(gradients * output, axis=-1, keepdims=True)
+            return (output * mx.ndarray.broadcast_sub(gradients, dot),)
         return output, backward
 
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        return mx.ndarray.softmax(args[0], out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.softmax(args[0])
+
     def assert_output_shape(self, args, shape):
         assert len(args) == 1
         x = args[0]
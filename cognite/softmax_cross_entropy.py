@@ -1,45 +1,55 @@
+from cognite import data
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class SoftmaxCrossEntropy(expr.Function):
+    supports_out = True
+    nondifferentiable_args = (1,)
+
     def forward(self, args):
         x, labels = args
         assert(x.shape == labels.shape)
 
+        log_t = mx.ndarray.log_softmax(x)
         def backward(gradients):
-            t = mx.ndarray.softmax(x)
-            x_gradient = mx.ndarray.multiply(gradients, mx.ndarray.subtract(t, labels))
+            x_gradient = mx.ndarray.exp(log_t)
+            x_gradient -= labels
+            x_gradient = \
+                mx.ndarray.broadcast_mul(
+                    x_gradient,
+                    mx.ndarray.expand_dims(gradients, axis=-1),
+                )
+            return (x_gradient, data.zero)
+
+        output = mx.ndarray.sum(mx.ndarray.multiply(labels, log_t), axis=-1)
+        output *= -1
 
-            # FIXME:
-            label_gradient = mx.ndarray.zeros(labels.shape)
-            return (x_gradient, label_gradient)
+        return output, backward
 
-        output = \
-            -mx.ndarray.sum(
-                mx.ndarray.multiply(labels, mx.ndarray.log_softmax(x)),
+    def infer(self, args, out=None):
+        x, labels = args
+        output = mx.ndarray.sum(mx.ndarray.multiply(labels, mx.ndarray.log_softmax(x)), axis=-1, out=out)
+        output *= -1
+        return output
+
+    def symbol(self, args):
+        x, labels = args
+        return \
+            -mx.symbol.sum(
+                mx.symbol.BlockGrad(labels) * mx.symbol.log_softmax(x),
                 axis=-1,
             )
 
-        return output, backward
-
-    def assert_output_shape(self, args, shape):
-        a, b = args
-        a.assert_shape(shape)
-        b.assert_shape(shape)
-
     def get_output_shape(self, args):
         a, b = args
         try:
             shape = a.get_shape()
         except expr.ShapeError:
-            pass
+            shape = b.get_shape()
+            a.assert_shape(shape)
         else:
             b.assert_shape(shape)
-            return shape
-
-        shape = b.get_shape()
-        a.assert_shape(shape)
-        return shape
+        return shape[:-1]
 
 softmax_cross_entropy_fn = SoftmaxCrossEntropy()
 
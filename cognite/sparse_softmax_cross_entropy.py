@@ -0,0 +1,56 @@
+from cognite import data
+from cognite import expr
+from cognite.lazy import mx
+
+class SparseSoftmaxCrossEntropy(expr.Function):
+    supports_out = True
+    nondifferentiable_args = (1,)
+
+    def forward(self, args):
+        x, labels = args
+        assert(x.shape[:-1] == labels.shape)
+
+        log_t = mx.ndarray.log_softmax(x)
+        def backward(gradients):
+            x_gradient = mx.ndarray.exp(log_t)
+            x_gradient -= mx.ndarray.one_hot(labels, depth=x.shape[-1], dtype=x.dtype)
+            x_gradient = \
+                mx.ndarray.broadcast_mul(
+                    x_gradient,
+                    mx.ndarray.expand_dims(gradients, axis=-1),
+                )
+            return (x_gradient, data.zero)
+
+        output = mx.ndarray.pick(log_t, labels, axis=-1)
+        output *= -1
+
+        return output, backward
+
+    def infer(self, args, out=None):
+        x, labels = args
+        output = mx.ndarray.pick(mx.ndarray.log_softmax(x), labels, axis=-1, out=out)
+        output *= -1
+        return output
+
+    def symbol(self, args):
+        x, labels = args
+        return \
+            -mx.symbol.pick(
+                mx.symbol.log_softmax(x),
+                mx.symbol.BlockGrad(labels),
+                axis=-1,
+            )
+
+    def get_output_shape(self, args):
+        x, labels = args
+        shape = x.get_shape()
+        labels.assert_shape(shape[:-1])
+        return shape[:-1]
+
+sparse_softmax_cross_entropy_fn = SparseSoftmaxCrossEntropy()
+
+def sparse_softmax_cross_entropy(x, labels):
+    if isinstance(x, expr.Constant) and isinstance(labels, expr.Constant):
+        return expr.Constant(sparse_softmax_cross_entropy_fn.forward([x.value, labels.value])[0])
+    else:
+        return expr.Apply(sparse_softmax_cross_entropy_fn, [x, labels])
@@ -1,7 +1,9 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Sqrt(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         assert len(args) == 1
         x = args[0]
@@ -19,6 +21,14 @@ class Sqrt(expr.Function):
             return (output,)
         return s, backward
 
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        return mx.ndarray.sqrt(args[0], out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.sqrt(args[0])
+
     def assert_output_shape(self, args, shape):
         assert len(args) == 1
         x = args[0]
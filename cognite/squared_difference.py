@@ -1,15 +1,27 @@
 from cognite import expr
-import numpy as np
+from cognite.lazy import mx
 
 class SquaredDifference(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         a, b = args
         difference = a - b
         output = difference**2
         def backwards(gradients):
-            return (2*difference, -2*difference)
+            a_gradient = 2*difference*gradients
+            return (a_gradient, -a_gradient)
         return output, backwards
 
+    def infer(self, args, out=None):
+        a, b = args
+        output = mx.ndarray.elemwise_sub(a, b, out=out)
+        return mx.ndarray.square(output, out=output)
+
+    def symbol(self, args):
+        a, b = args
+        return mx.symbol.square(a - b)
+
     def assert_output_shape(self, args, shape):
         a, b = args
         a.assert_shape(shape)
@@ -1,7 +1,9 @@
 from cognite import expr
-import mxnet as mx
+from cognite.lazy import mx
 
 class Subtract(expr.Function):
+    supports_out = True
+
     def forward(self, args):
         activations, biases = args
 
@@ -10,6 +12,14 @@ class Subtract(expr.Function):
             return (gradients, -gradients)
         return output, backward
 
+    def infer(self, args, out=None):
+        a, b = args
+        return mx.ndarray.elemwise_sub(a, b, out=out)
+
+    def symbol(self, args):
+        a, b = args
+        return a - b
+
     def assert_output_shape(self, args, shape):
         a, b = args
         a.assert_shape(shape)
@@ -0,0 +1,200 @@
+from cognite import data
+from cognite import expr
+from cognite.lazy import mx
+
+def lookup(args, path):
+    index, attrs = path
+    value = args[index]
+    for attr in attrs:
+        value = value[attr]
+    return value
+
+def insert(output, path, value):
+    index, attrs = path
+    if not attrs:
+        output[index] = value
+        return
+    if output[index] is None:
+        output[index] = {}
+    tree = output[index]
+    for attr in attrs[:-1]:
+        tree = tree.setdefault(attr, {})
+    tree[attrs[-1]] = value
+
+class Binding:
+    def __init__(self, executor):
+        self.executor = executor
+        self.calls = 0
+
+class Backward:
+    def __init__(self, program, binding):
+        self.program = program
+        self.binding = binding
+        self.call = binding.calls
+
+    def __call__(self, gradient):
+        if self.binding.calls != self.call:
+            raise Exception('executor has been reused since this forward pass')
+        executor = self.binding.executor
+        output = [None] * len(self.program.parameters)
+        if not gradient is data.zero:
+            executor.backward(out_grads=[gradient])
+            for name, path in zip(self.program.names, self.program.paths):
+                if self.program.grad_req[name] == 'null':
+                    insert(output, path, data.zero)
+                else:
+                    insert(output, path, executor.grad_dict[name].copy())
+        for i, gradient in enumerate(output):
+            if gradient is None:
+                output[i] = data.zero
+        return tuple(output)
+
+class Program:
+    def __init__(self, parameters, body):
+        self.parameters = parameters
+        self.names = []
+        self.paths = []
+        self.constants = {}
+        self.executors = {}
+        self.body = body
+        self.exprs = expr.topological_sort(body)
+        self.variables = {}
+
+        paths = {}
+        for i, parameter in enumerate(parameters):
+            paths[parameter] = (i, ())
+
+        for e in self.exprs:
+            if isinstance(e, expr.Variable):
+                if not e in paths:
+                    raise ValueError('%s is not a parameter' % e.name)
+            elif isinstance(e, expr.Index):
+                index, attrs = paths[e.value]
+                paths[e] = (index, attrs + (e.attr,))
+            if isinstance(e, (expr.Variable, expr.Index)):
+                if e.shape:
+                    name = 'x%d' % len(self.names)
+                    self.names.append(name)
+                    self.paths.append(paths[e])
+                    self.variables[e] = name
+            elif isinstance(e, expr.Constant):
+                name = 'c%d' % len(self.constants)
+                self.constants[name] = e.value
+                self.variables[e] = name
+            elif not isinstance(e, expr.Apply):
+                raise NotImplementedError()
+
+        # Leaves only reached through arguments that never get a gradient,
+        # like labels, aren't differentiated, and get data.zero as the
+        # other backends give them.
+        differentiable = {body}
+        for e in reversed(self.exprs):
+            if e in differentiable and isinstance(e, expr.Apply):
+                differentiable.update(
+                    arg
+                    for i, arg in enumerate(e.args)
+                    if not i in e.function.nondifferentiable_args
+                )
+
+        self.grad_req = {}
+        for e, name in self.variables.items():
+            if name in self.names:
+                self.grad_req[name] = 'write' if e in differentiable else 'null'
+        for name in self.constants:
+            self.grad_req[name] = 'null'
+
+    @property
+    def inputs(self):
+        return len(self.parameters)
+
+    @property
+    def outputs(self):
+        return 1
+
+    def lower(self):
+        symbols = {}
+        for e in self.exprs:
+            if e in self.variables:
+                symbols[e] = mx.symbol.Variable(self.variables[e])
+            elif isinstance(e, expr.Apply):
+                symbols[e] = e.function.symbol([symbols[arg] for arg in e.args])
+        return symbols[self.body]
+
+    def bind(self, values):
+        # Executors are bound to their inputs' types as well as shapes, so
+        # float64 inputs are computed in float64 rather than cast down.
+        key = tuple((value.shape, value.dtype) for value in values)
+        binding = self.executors.get(key)
+        if binding is None:
+            arg_shapes = {}
+            arg_types = {}
+            for name, value in zip(self.names, values):
+                arg_shapes[name] = value.shape
+                arg_types[name] = value.dtype
+            for name, value in self.constants.items():
+                arg_shapes[name] = value.shape
+                arg_types[name] = value.dtype
+            executor = \
+                self.lower().simple_bind(
+                    ctx = values[0].context if values else mx.cpu(),
+                    grad_req = self.grad_req,
+                    type_dict = arg_types,
+                    **arg_shapes
+                )
+            for name, value in self.constants.items():
+                value.copyto(executor.arg_dict[name])
+            binding = Binding(executor)
+            self.executors[key] = binding
+        return binding
+
+    def run(self, args, is_train):
+        assert len(args) == len(self.parameters)
+        values = [lookup(args, path) for path in self.paths]
+        binding = self.bind(values)
+        executor = binding.executor
+        for name, value in zip(self.names, values):
+            value.copyto(executor.arg_dict[name])
+        executor.forward(is_train=is_train)
+        binding.calls += 1
+        return executor.outputs[0].copy(), binding
+
+    def __call__(self, *args):
+        output, binding = self.run(args, True)
+        return (output,), Backward(self, binding)
+
+    def infer(self, *args):
+        output, binding = self.run(args, False)
+        return (output,)
+
+    def __repr__(self):
+        return "Program(%s)" % ', '.join(self.names)
+
+def check_parity(function, args, gradient=None, rtol=1e-4, atol=1e-5):
+    parameters = []
+    for i, arg in enumerate(args):
+        parameter = expr.Variable('arg%d' % i)
+        parameter.assert_shape(arg.shape)
+        parameters.append(parameter)
+    body = expr.Apply(function, parameters)
+
+    eager_output, eager_backward = function.forward(list(args))
+    (symbol_output,), symbol_backward = Program(parameters, body)(*args)
+    if gradient is None:
+        gradient = mx.ndarray.ones(eager_output.shape)
+
+    pairs = [(eager_output, symbol_output)]
+    pairs.extend(zip(eager_backward(gradient), symbol_backward(gradient)))
+    for eager, symbolic in pairs:
+        if eager is data.zero or symbolic is data.zero:
+            if eager is not symbolic:
+                raise AssertionError('%s: only one backend gives a structural zero' % repr(function))
+            continue
+        if eager.dtype != symbolic.dtype:
+            raise AssertionError('%s: type %s differs from %s' % (repr(function), eager.dtype, symbolic.dtype))
+        eager = eager.asnumpy()
+        symbolic = symbolic.asnumpy()
+        if eager.shape != symbolic.shape:
+            raise AssertionError('%s: shape %s differs from %s' % (repr(function), eager.shape, symbolic.shape))
+        error = abs(eager - symbolic) - atol - rtol * abs(eager)
+        if error.size and error.max() > 0:
+            raise AssertionError('%s: results differ by up to %g' % (repr(function), abs(eager - symbolic).max()))
@@ -0,0 +1,218 @@
+from cognite import data
+from cognite import expr
+from cognite import planner
+from cognite import profiler
+import collections.abc
+from cognite.lazy import np
+
+class Instruction:
+    def __init__(self, inputs, output):
+        self.inputs = inputs
+        self.output = output
+
+    def forward(self, registers):
+        raise NotImplementedError("not implemented for %s" % repr(type(self)))
+
+    def infer(self, registers, out=None):
+        raise NotImplementedError("not implemented for %s" % repr(type(self)))
+
+    def backward(self, state, gradient):
+        raise NotImplementedError("not implemented for %s" % repr(type(self)))
+
+class Apply(Instruction):
+    def __init__(self, function, inputs, output):
+        super().__init__(inputs, output)
+        self.function = function
+
+    def forward(self, registers):
+        if profiler.current is not None:
+            return profiler.current.forward(self, self.function, [registers[i] for i in self.inputs])
+        return self.function.forward([registers[i] for i in self.inputs])
+
+    def infer(self, registers, out=None):
+        if profiler.current is not None:
+            return profiler.current.infer(self, self.function, [registers[i] for i in self.inputs], out)
+        if out is None:
+            return self.function.infer([registers[i] for i in self.inputs])
+        return self.function.infer([registers[i] for i in self.inputs], out=out)
+
+    def backward(self, back, gradient):
+        return back(gradient)
+
+    def __repr__(self):
+        return "r%d = Apply(%s, %s)" % (self.output, repr(self.function), ', '.join('r%d' % i for i in self.inputs))
+
+class Index(Instruction):
+    def __init__(self, attr, inputs, output):
+        super().__init__(inputs, output)
+        self.attr = attr
+
+    def forward(self, registers):
+        return registers[self.inputs[0]][self.attr], None
+
+    def infer(self, registers, out=None):
+        return registers[self.inputs[0]][self.attr]
+
+    def backward(self, state, gradient):
+        return ({self.attr: gradient},)
+
+    def __repr__(self):
+        return "r%d = Index(r%d, %s)" % (self.output, self.inputs[0], repr(self.attr))
+
+class Constant(Instruction):
+    def __init__(self, value, output):
+        super().__init__((), output)
+        self.value = value
+
+    def forward(self, registers):
+        return self.value, None
+
+    def infer(self, registers, out=None):
+        return self.value
+
+    def backward(self, state, gradient):
+        return ()
+
+    def __repr__(self):
+        return "r%d = Constant()" % self.output
+
+class Tape:
+    def __init__(self, program, states):
+        self.program = program
+        self.states = states
+
+    def __call__(self, gradient):
+        program = self.program
+        gradients = [None] * program.size
+        gradients[program.output] = gradient
+        for instruction, state in zip(reversed(program.instructions), reversed(self.states)):
+            output_gradient = gradients[instruction.output]
+            if output_gradient is None or output_gradient is data.zero:
+                continue
+            input_gradients = instruction.backward(state, output_gradient)
+            for i, input_gradient in zip(instruction.inputs, input_gradients):
+                if gradients[i] is None:
+                    gradients[i] = input_gradient
+                else:
+                    gradients[i] = program.accumulators[i](gradients[i], input_gradient)
+        output = gradients[:program.inputs]
+        for i, gradient in enumerate(output):
+            if gradient is None:
+                output[i] = data.zero
+        return tuple(output)
+
+def context(args):
+    for arg in args:
+        while isinstance(arg, collections.abc.Mapping) and arg:
+            arg = next(iter(arg.values()))
+        if hasattr(arg, 'context'):
+            return arg.context
+    return None
+
+def leaves(values):
+    for value in values:
+        if isinstance(value, collections.abc.Mapping):
+            yield from leaves(value.values())
+        else:
+            yield value
+
+# Intermediates take the type of the floating point values they're
+# computed from, integer inputs like labels only select among them.
+def float_dtype(args):
+    for arg in leaves(args):
+        dtype = getattr(arg, 'dtype', None)
+        if dtype is not None and np.issubdtype(dtype, np.floating):
+            return np.dtype(dtype).name
+    return 'float32'
+
+class Program:
+    def __init__(self, parameters, body, reuse_buffers=False, plan_memory=False):
+        slots = {}
+        for parameter in parameters:
+            slots[parameter] = len(slots)
+
+        instructions = []
+        for e in expr.topological_sort(body):
+            if isinstance(e, expr.Variable):
+                if not e in slots:
+                    raise ValueError('%s is not a parameter' % e.name)
+                continue
+            slot = len(slots)
+            if isinstance(e, expr.Apply):
+                inputs = tuple(slots[arg] for arg in e.args)
+                instructions.append(Apply(e.function, inputs, slot))
+            elif isinstance(e, expr.Constant):
+                instructions.append(Constant(e.value, slot))
+            elif isinstance(e, expr.Index):
+                instructions.append(Index(e.attr, (slots[e.value],), slot))
+            else:
+                raise NotImplementedError()
+            slots[e] = slot
+
+        self.instructions = instructions
+        self.size = len(slots)
+        self.output = slots[body]
+        self.body = body
+        self.slots = slots
+        self.plan_memory = plan_memory
+        self.plans = {}
+
+        last_uses = {}
+        for i, instruction in enumerate(instructions):
+            for j in instruction.inputs:
+                last_uses[j] = i
+        self.releases = [[] for instruction in instructions]
+        for j, i in last_uses.items():
+            if j != self.output:
+                self.releases[i].append(j)
+
+        self.accumulators = [data.add] * self.size
+        if reuse_buffers:
+            for i in range(self.size):
+                self.accumulators[i] = data.Accumulator()
+
+    @property
+    def inputs(self):
+        return self.size - len(self.instructions)
+
+    @property
+    def outputs(self):
+        return 1
+
+    def __call__(self, *args):
+        assert len(args) == self.inputs
+        registers = list(args) + [None] * len(self.instructions)
+        states = []
+        for instruction in self.instructions:
+            registers[instruction.output], state = instruction.forward(registers)
+            states.append(state)
+        return (registers[self.output],), Tape(self, states)
+
+    def planned_outputs(self, args):
+        dtype = float_dtype(args)
+        key = (dtype, tuple(sorted((dim.name, n) for dim, n in expr.bindings.stack[-1].items())))
+        outputs = self.plans.get(key)
+        if outputs is None:
+            plan = planner.MemoryPlan(self.body, dtype)
+            views = plan.allocate(context(args))
+            outputs = [None] * self.size
+            for e, view in views.items():
+                outputs[self.slots[e]] = view
+            self.plans[key] = outputs
+        return outputs
+
+    def infer(self, *args):
+        assert len(args) == self.inputs
+        registers = list(args) + [None] * len(self.instructions)
+        if self.plan_memory:
+            outputs = self.planned_outputs(args)
+        else:
+            outputs = [None] * self.size
+        for instruction, releases in zip(self.instructions, self.releases):
+            registers[instruction.output] = instruction.infer(registers, outputs[instruction.output])
+            for j in releases:
+                registers[j] = None
+        return (registers[self.output],)
+
+    def __repr__(self):
+        return "Program(%s)" % ', '.join(map(repr, self.instructions))
@@ -1,5 +1,14 @@
+from cognite import data
+from cognite import meta
+from cognite import optimizers
+from cognite import pipeline
+from cognite import profiler
 import argparse
+import contextlib
 import importlib
+from cognite.lazy import mx
+import os
+import time
 
 def load_value(name):
     parts = name.split('.')
@@ -16,6 +25,81 @@ def load_value(name):
     else:
         raise Exception('failed to find ' + name)
 
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def save_checkpoint(parameters, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fd:
+        data.dump(parameters, fd)
+    os.replace(tmp_path, path)
+
+def train(
+        model,
+        batches,
+        optimizer,
+        parameters=None,
+        steps=None,
+        log_interval=100,
+        checkpoint=None,
+        checkpoint_interval=1000,
+        log=print,
+    ):
+    if parameters is None:
+        parameters = model.parameters[0].instantiate()
+
+    step_times = []
+    losses = []
+    examples = 0
+    interval_start = time.perf_counter()
+    step = 0
+    for batch in batches:
+        if steps is not None and step >= steps:
+            break
+        step += 1
+
+        step_start = time.perf_counter()
+        (loss,), backward = model(parameters, *batch)
+        gradients = backward(mx.ndarray.ones(loss.shape))
+        optimizer.update(parameters, gradients[0])
+        mx.ndarray.waitall()
+        step_times.append(time.perf_counter() - step_start)
+        losses.append(mx.ndarray.mean(loss).asscalar())
+        examples += batch[0].shape[0]
+
+        if step % log_interval == 0:
+            elapsed = time.perf_counter() - interval_start
+            log(
+                'step %d loss %.5f %.1f examples/sec step p50 %.2fms p90 %.2fms p99 %.2fms' % (
+                    step,
+                    sum(losses) / len(losses),
+                    examples / elapsed,
+                    percentile(step_times, 0.5) * 1000,
+                    percentile(step_times, 0.9) * 1000,
+                    percentile(step_times, 0.99) * 1000,
+                )
+            )
+            step_times = []
+            losses = []
+            examples = 0
+            interval_start = time.perf_counter()
+
+        if checkpoint and step % checkpoint_interval == 0:
+            save_checkpoint(parameters, checkpoint)
+
+    if checkpoint:
+        save_checkpoint(parameters, checkpoint)
+    return parameters
+
+optimizer_types = {
+    'sgd': optimizers.SGD,
+    'adam': optimizers.Adam,
+    'rmsprop': optimizers.RMSProp,
+}
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description = 'Training')
 
@@ -35,8 +119,96 @@ if __name__ == '__main__':
         required=True,
     )
 
+    parser.add_argument(
+        '--batches',
+        '-n',
+        type=int,
+        help='The number of batches to train for, defaults to the whole data loader',
+    )
+
+    parser.add_argument(
+        '--log-interval',
+        type=int,
+        default=100,
+        help='The number of batches between progress reports',
+    )
+
+    parser.add_argument(
+        '--checkpoint',
+        '-c',
+        type=str,
+        help='A path to periodically save the parameters to',
+    )
+
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=int,
+        default=1000,
+        help='The number of batches between checkpoints',
+    )
+
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Load the initial parameters from the checkpoint',
+    )
+
+    parser.add_argument(
+        '--prefetch',
+        type=int,
+        default=2,
+        help='The number of batches to prepare in the background, 0 to disable',
+    )
+
+    parser.add_argument(
+        '--optimizer',
+        choices=sorted(optimizer_types),
+        default='sgd',
+    )
+
+    parser.add_argument(
+        '--learning-rate',
+        '-l',
+        type=float,
+        default=0.01,
+    )
+
+    parser.add_argument(
+        '--profile',
+        type=str,
+        help='A path to write a Chrome trace of the latest op timings to, also printing a summary of all of them',
+    )
+
     args = parser.parse_args()
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume requires --checkpoint')
     data_loader = load_value(args.data_loader)
     model = load_value(args.model)
-    print(data_loader)
-    print(model)
+    if not isinstance(model, meta.Function):
+        raise Exception('expected %s to be a differentiable function' % args.model)
+    if callable(data_loader):
+        data_loader = data_loader()
+    if args.prefetch > 0 and not isinstance(data_loader, pipeline.Pipeline):
+        data_loader = pipeline.Prefetcher(data_loader, args.prefetch)
+
+    parameters = None
+    if args.resume:
+        with open(args.checkpoint, 'rb') as fd:
+            parameters = data.load(fd)
+
+    with contextlib.ExitStack() as stack:
+        if args.profile:
+            profile = stack.enter_context(profiler.Profiler(synchronize=True))
+        train(
+            model,
+            data_loader,
+            optimizer_types[args.optimizer](learning_rate=args.learning_rate),
+            parameters=parameters,
+            steps=args.batches,
+            log_interval=args.log_interval,
+            checkpoint=args.checkpoint,
+            checkpoint_interval=args.checkpoint_interval,
+        )
+    if args.profile:
+        print(profile.report())
+        profile.dump_trace(args.profile)
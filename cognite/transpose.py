@@ -0,0 +1,49 @@
+from cognite import expr
+from cognite.lazy import mx
+
+def inverse(axes):
+    output = [0] * len(axes)
+    for i, axis in enumerate(axes):
+        output[axis] = i
+    return tuple(output)
+
+class Transpose(expr.Function):
+    supports_out = True
+
+    def __init__(self, axes):
+        self.axes = tuple(axes)
+
+    def forward(self, args):
+        assert len(args) == 1
+        output = mx.ndarray.transpose(args[0], axes=self.axes)
+        def backwards(gradients):
+            return (mx.ndarray.transpose(gradients, axes=inverse(self.axes)),)
+        return output, backwards
+
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        return mx.ndarray.transpose(args[0], axes=self.axes, out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        return mx.symbol.transpose(args[0], axes=self.axes)
+
+    def assert_output_shape(self, args, shape):
+        assert len(args) == 1
+        args[0].assert_shape(tuple(shape[i] for i in inverse(self.axes)))
+
+    def get_output_shape(self, args):
+        assert len(args) == 1
+        shape = args[0].get_shape()
+        if len(shape) != len(self.axes):
+            raise expr.ShapeError('Cannot transpose %s by %s' % (shape, self.axes))
+        return tuple(shape[i] for i in self.axes)
+
+    def __repr__(self):
+        return "Transpose(%s)" % repr(self.axes)
+
+def transpose(values, axes):
+    if isinstance(values, expr.Constant):
+        return expr.Constant(Transpose(axes).forward([values.value])[0])
+    else:
+        return expr.Apply(Transpose(axes), [values])
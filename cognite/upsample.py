@@ -1,24 +1,21 @@
 from cognite import expr
-import mxnet as mx
+from cognite.convolution import check_layout, to_nchw, to_nhwc
+from cognite.lazy import mx
 
 class Upsample(expr.Function):
-    def __init__(self, scale):
+    supports_out = True
+
+    def __init__(self, scale, layout='NHWC'):
+        check_layout(layout)
         self.scale = scale
+        self.layout = layout
 
     def forward(self, args):
         assert len(args) == 1
-        values = args[0]
-
-        values = mx.ndarray.transpose(values, axes=(0, 3, 1, 2))
-        output = \
-            mx.ndarray.UpSampling(
-                data = values,
-                scale = self.scale,
-                sample_type = 'nearest',
-            )
-        output = mx.ndarray.transpose(output, axes=(0, 2, 3, 1))
+        output = self.infer(args)
         def backwards(gradients):
-            gradients = mx.ndarray.transpose(gradients, axes=(0, 3, 1, 2))
+            if self.layout == 'NHWC':
+                gradients = mx.ndarray.transpose(gradients, axes=to_nchw)
             output = \
                 mx.ndarray.Pooling(
                     data = gradients,
@@ -26,11 +23,62 @@ class Upsample(expr.Function):
                     pool_type = 'sum',
                     stride = (self.scale, self.scale),
                 )
-            raise Exception("FIXME, missing transpose")
+            if self.layout == 'NHWC':
+                output = mx.ndarray.transpose(output, axes=to_nhwc)
+            return (output,)
         return output, backwards
 
-def upsample(values, scale):
+    def infer(self, args, out=None):
+        assert len(args) == 1
+        values = args[0]
+        if self.layout == 'NCHW':
+            return \
+                mx.ndarray.UpSampling(
+                    values,
+                    scale = self.scale,
+                    sample_type = 'nearest',
+                    num_args = 1,
+                    out = out,
+                )
+        values = mx.ndarray.transpose(values, axes=to_nchw)
+        output = \
+            mx.ndarray.UpSampling(
+                values,
+                scale = self.scale,
+                sample_type = 'nearest',
+                num_args = 1,
+            )
+        return mx.ndarray.transpose(output, axes=to_nhwc, out=out)
+
+    def symbol(self, args):
+        assert len(args) == 1
+        values = args[0]
+        if self.layout == 'NHWC':
+            values = mx.symbol.transpose(values, axes=to_nchw)
+        output = \
+            mx.symbol.UpSampling(
+                values,
+                scale = self.scale,
+                sample_type = 'nearest',
+                num_args = 1,
+            )
+        if self.layout == 'NHWC':
+            return mx.symbol.transpose(output, axes=to_nhwc)
+        return output
+
+    def get_output_shape(self, args):
+        assert len(args) == 1
+        shape = args[0].get_shape()
+        if len(shape) != 4:
+            raise expr.ShapeError('expected values to be 4D, %s' % self.layout)
+        if self.layout == 'NHWC':
+            batch, height, width, channels = shape
+            return (batch, height * self.scale, width * self.scale, channels)
+        batch, channels, height, width = shape
+        return (batch, channels, height * self.scale, width * self.scale)
+
+def upsample(values, scale, layout='NHWC'):
     if isinstance(values, expr.Constant):
-        return expr.Constant(Upsample(scale).forward(values.value))
+        return expr.Constant(Upsample(scale, layout).forward([values.value])[0])
     else:
-        return expr.Apply(Upsample(scale), [values])
+        return expr.Apply(Upsample(scale, layout), [values])
@@ -0,0 +1,54 @@
+import mxnet as mx
+import numpy as np
+import pytest
+
+from cognite import expr
+from cognite import meta
+from cognite.meta import add, linear, mean, relu
+
+def model(params, x):
+    x.assert_shape((expr.batch, 8))
+    params['w'].assert_shape((8, 8))
+    # Both the weights and every activation fan out.
+    h = x
+    for i in range(4):
+        h = relu(linear(h, params['w']))
+        h = add(add(h, h), h)
+    return mean(h, (0, 1))
+
+def inputs():
+    return {'w': mx.nd.random_normal(shape=(8, 8))}, mx.nd.random_normal(shape=(4, 8))
+
+def count_arrays(monkeypatch, step):
+    count = [0]
+    init = mx.nd.NDArray.__init__
+    def counting(self, *args, **kwargs):
+        count[0] += 1
+        init(self, *args, **kwargs)
+    with monkeypatch.context() as patch:
+        patch.setattr(mx.nd.NDArray, '__init__', counting)
+        step()
+        mx.nd.waitall()
+    return count[0]
+
+@pytest.mark.parametrize('backend', ['combinators', 'tape'])
+def test_reused_buffers_allocate_less(monkeypatch, backend):
+    params, x = inputs()
+    counts = {}
+    gradients = {}
+    for reuse_buffers in [False, True]:
+        function = meta.differentiable_function(model, backend=backend, reuse_buffers=reuse_buffers)
+        steps = []
+        for i in range(2):
+            (loss,), backward = function(params, x)
+            counts[reuse_buffers] = count_arrays(monkeypatch, lambda: steps.append(backward(mx.nd.ones(loss.shape))))
+        gradients[reuse_buffers] = steps
+    assert counts[True] < counts[False]
+
+    # Reused buffers are handed back again by the next backward pass, so
+    # a gradient kept from the first holds the second's values.
+    (first, x_first), (second, x_second) = gradients[True]
+    assert first['w'] is second['w']
+    (expected, x_expected) = gradients[False][1]
+    np.testing.assert_allclose(second['w'].asnumpy(), expected['w'].asnumpy(), rtol=1e-5)
+    np.testing.assert_allclose(x_second.asnumpy(), x_expected.asnumpy(), rtol=1e-5)
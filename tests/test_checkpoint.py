@@ -0,0 +1,45 @@
+import mxnet as mx
+import numpy as np
+import pytest
+
+from cognite import expr
+from cognite import meta
+from cognite.meta import add_biases, linear, mean, relu, reshape, squared_difference
+
+def model(params, x):
+    x.assert_shape((expr.batch, 8))
+    h = x
+    for i in range(4):
+        params['w%d' % i].assert_shape((8, 8))
+        h = relu(add_biases(linear(h, params['w%d' % i]), params['b%d' % i]))
+        # Reshapes to symbolic shapes need the batch bound inside segments.
+        h = reshape(reshape(h, (expr.batch, 2, 4)), (expr.batch, 8))
+    return mean(squared_difference(h, x), (0, 1))
+
+def inputs(batch):
+    params = {}
+    for i in range(4):
+        params['w%d' % i] = mx.nd.random_normal(shape=(8, 8))
+        params['b%d' % i] = mx.nd.random_normal(shape=(8,))
+    return params, mx.nd.random_normal(shape=(batch, 8))
+
+@pytest.mark.parametrize('backend', ['combinators', 'tape'])
+@pytest.mark.parametrize('checkpoints', ['sqrt', 2])
+def test_checkpoints_bind_symbolic_batch(backend, checkpoints):
+    reference = meta.differentiable_function(model, backend=backend)
+    checkpointed = meta.differentiable_function(model, backend=backend, checkpoints=checkpoints)
+    for batch in [3, 5]:
+        params, x = inputs(batch)
+        (expected,), expected_backward = reference(params, x)
+        (output,), backward = checkpointed(params, x)
+        expected_gradients = expected_backward(mx.nd.ones(expected.shape))
+        gradients = backward(mx.nd.ones(output.shape))
+        np.testing.assert_allclose(output.asnumpy(), expected.asnumpy(), rtol=1e-5)
+        np.testing.assert_allclose(gradients[1].asnumpy(), expected_gradients[1].asnumpy(), rtol=1e-4, atol=1e-6)
+        for name in params:
+            np.testing.assert_allclose(
+                gradients[0][name].asnumpy(),
+                expected_gradients[0][name].asnumpy(),
+                rtol=1e-4,
+                atol=1e-6,
+            )
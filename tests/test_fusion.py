@@ -0,0 +1,42 @@
+import mxnet as mx
+import numpy as np
+import pytest
+
+from cognite import expr
+from cognite import meta
+from cognite.meta import add, add_biases, linear, mean, relu, sigmoid, squared_difference
+
+def model(params, x):
+    x.assert_shape((expr.batch, 8))
+    h = x
+    for i in range(2):
+        params['w%d' % i].assert_shape((8, 8))
+        h = add(h, relu(add_biases(linear(h, params['w%d' % i]), params['b%d' % i])))
+    return mean(squared_difference(sigmoid(h), x), (0, 1))
+
+def inputs():
+    params = {}
+    for i in range(2):
+        params['w%d' % i] = mx.nd.random_normal(shape=(8, 8))
+        params['b%d' % i] = mx.nd.random_normal(shape=(8,))
+    return params, mx.nd.random_normal(shape=(4, 8))
+
+def flatten(gradients):
+    params, x = gradients
+    return [params[name].asnumpy() for name in sorted(params)] + [x.asnumpy()]
+
+@pytest.mark.parametrize('backend', ['combinators', 'tape'])
+def test_fused_matches_unfused(backend):
+    unfused = meta.differentiable_function(model, backend=backend)
+    fused = meta.differentiable_function(model, backend=backend, fuse=True)
+    params, x = inputs()
+    (expected,), expected_backward = unfused(params, x)
+    (output,), backward = fused(params, x)
+    (inferred,) = fused.infer(params, x)
+    np.testing.assert_allclose(output.asnumpy(), expected.asnumpy(), rtol=1e-5)
+    np.testing.assert_allclose(inferred.asnumpy(), expected.asnumpy(), rtol=1e-5)
+    expected_gradients = flatten(expected_backward(mx.nd.ones(expected.shape)))
+    # Backward can be run again on the same forward pass.
+    for i in range(2):
+        for gradient, expected_gradient in zip(flatten(backward(mx.nd.ones(output.shape))), expected_gradients):
+            np.testing.assert_allclose(gradient, expected_gradient, rtol=1e-4, atol=1e-6)
@@ -0,0 +1,87 @@
+import mxnet as mx
+import numpy as np
+import pytest
+
+from cognite.symbol import check_parity
+from cognite.add import add_fn
+from cognite.add_biases import AddBiases, add_biases_fn
+from cognite.broadcast import Broadcast
+from cognite.concat import Concat
+from cognite.convolution import Convolution
+from cognite.divide import divide_fn
+from cognite.linear import linear_fn
+from cognite.mean import Mean
+from cognite.relu import relu_fn
+from cognite.reshape import Reshape
+from cognite.sigmoid import sigmoid_fn
+from cognite.sigmoid_cross_entropy import sigmoid_cross_entropy_fn
+from cognite.softmax import softmax_fn
+from cognite.softmax_cross_entropy import softmax_cross_entropy_fn
+from cognite.sparse_softmax_cross_entropy import sparse_softmax_cross_entropy_fn
+from cognite.sqrt import sqrt_fn
+from cognite.squared_difference import squared_difference_fn
+from cognite.subtract import subtract_fn
+from cognite.transpose import Transpose
+from cognite.upsample import Upsample
+
+def normal(*shape):
+    return mx.nd.random_normal(shape=shape, dtype='float64')
+
+def positive(*shape):
+    return mx.nd.random_uniform(low=0.5, high=2, shape=shape, dtype='float64')
+
+def probabilities(*shape):
+    return mx.nd.softmax(normal(*shape))
+
+def binary(*shape):
+    return mx.nd.random_uniform(shape=shape, dtype='float64') > 0.5
+
+def classes(batch, n):
+    return mx.nd.floor(mx.nd.random_uniform(high=n, shape=(batch,), dtype='float64'))
+
+# Every op behind the builders in meta, with arguments in its domain.
+cases = [
+    ('add', add_fn, lambda: [normal(4, 5), normal(4, 5)]),
+    ('add_biases', add_biases_fn, lambda: [normal(4, 5), normal(5)]),
+    ('add_biases_axis', AddBiases(-3), lambda: [normal(2, 3, 4, 4), normal(3)]),
+    ('broadcast', Broadcast((4, 5)), lambda: [normal(5)]),
+    ('broadcast_rank', Broadcast((3, 4, 5)), lambda: [normal(4, 1)]),
+    ('concat', Concat(1), lambda: [normal(4, 2), normal(4, 3)]),
+    ('convolution', Convolution((3, 3), 4), lambda: [normal(2, 6, 6, 3), normal(3, 3, 3, 4)]),
+    (
+        'convolution_nchw_strided',
+        Convolution((3, 3), 4, 'NCHW', stride=2, pad=1, dilate=1),
+        lambda: [normal(2, 3, 7, 7), normal(3, 3, 3, 4)],
+    ),
+    (
+        'convolution_dilated',
+        Convolution((3, 2), 4, stride=(1, 2), pad=(2, 0), dilate=2),
+        lambda: [normal(2, 8, 9, 3), normal(3, 2, 3, 4)],
+    ),
+    ('divide', divide_fn, lambda: [normal(4, 5), positive(4, 5)]),
+    ('linear', linear_fn, lambda: [normal(4, 5), normal(5, 3)]),
+    ('mean', Mean((0,)), lambda: [normal(4, 5)]),
+    ('mean_all', Mean((0, 1)), lambda: [normal(4, 5)]),
+    ('relu', relu_fn, lambda: [normal(4, 5)]),
+    ('reshape', Reshape((5, 4)), lambda: [normal(4, 5)]),
+    ('sigmoid', sigmoid_fn, lambda: [normal(4, 5)]),
+    ('sigmoid_cross_entropy', sigmoid_cross_entropy_fn, lambda: [normal(4, 5), binary(4, 5)]),
+    ('softmax', softmax_fn, lambda: [normal(4, 5)]),
+    ('softmax_cross_entropy', softmax_cross_entropy_fn, lambda: [normal(4, 5), probabilities(4, 5)]),
+    ('sparse_softmax_cross_entropy', sparse_softmax_cross_entropy_fn, lambda: [normal(4, 5), classes(4, 5)]),
+    ('sqrt', sqrt_fn, lambda: [positive(4, 5)]),
+    ('squared_difference', squared_difference_fn, lambda: [normal(4, 5), normal(4, 5)]),
+    ('subtract', subtract_fn, lambda: [normal(4, 5), normal(4, 5)]),
+    ('transpose', Transpose((2, 0, 1)), lambda: [normal(2, 3, 4)]),
+    ('upsample', Upsample(2), lambda: [normal(2, 3, 3, 4)]),
+    ('upsample_nchw', Upsample(2, 'NCHW'), lambda: [normal(2, 4, 3, 3)]),
+]
+
+@pytest.mark.parametrize('name,function,args', cases, ids=[case[0] for case in cases])
+def test_parity(name, function, args):
+    args = args()
+    shape = function.forward(args)[0].shape
+    assert function.infer(args).dtype == np.float64
+    # A gradient other than ones catches backward passes that ignore it.
+    # check_parity also fails unless the symbol backend keeps float64.
+    check_parity(function, args, gradient=normal(*shape), rtol=1e-10, atol=1e-12)
@@ -0,0 +1,47 @@
+import mxnet as mx
+import numpy as np
+import pytest
+
+from cognite import expr
+from cognite import meta
+from cognite.meta import add, add_biases, linear, relu, sigmoid
+
+def model(params, x):
+    x.assert_shape((expr.batch, 8))
+    params['w1'].assert_shape((8, 16))
+    params['w2'].assert_shape((16, 16))
+    h = relu(add_biases(linear(x, params['w1']), params['b1']))
+    return sigmoid(add(linear(h, params['w2']), h))
+
+def inputs(dtype, batch=4):
+    params = {
+        'w1': mx.nd.random_normal(shape=(8, 16), dtype=dtype),
+        'b1': mx.nd.random_normal(shape=(16,), dtype=dtype),
+        'w2': mx.nd.random_normal(shape=(16, 16), dtype=dtype),
+    }
+    return params, mx.nd.random_normal(shape=(batch, 8), dtype=dtype)
+
+@pytest.mark.parametrize('dtype', ['float32', 'float64'])
+def test_planned_infer_keeps_dtype(dtype):
+    planned = meta.differentiable_function(model, backend='tape', plan_memory=True)
+    unplanned = meta.differentiable_function(model, backend='tape')
+    params, x = inputs(dtype)
+    (output,) = planned.infer(params, x)
+    (expected,) = unplanned.infer(params, x)
+    assert output.dtype == np.dtype(dtype)
+    np.testing.assert_allclose(output.asnumpy(), expected.asnumpy(), rtol=1e-3)
+
+def test_plans_are_kept_per_dtype():
+    planned = meta.differentiable_function(model, backend='tape', plan_memory=True)
+    for dtype in ['float32', 'float64', 'float32']:
+        params, x = inputs(dtype)
+        (output,) = planned.infer(params, x)
+        assert output.dtype == np.dtype(dtype)
+    assert len(planned.transformed.plans) == 2
+
+def test_memory_plan_counts_itemsize():
+    function = meta.differentiable_function(model, backend='tape', plan_memory=True)
+    single = function.memory_plan(*inputs('float32'))
+    double = function.memory_plan(*inputs('float64'))
+    assert double.naive_bytes == 2 * single.naive_bytes
+    assert double.planned_bytes == 2 * single.planned_bytes